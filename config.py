@@ -8,3 +8,8 @@ load_dotenv(find_dotenv())
 TRANSCRIPTION_RESULT_PATH = Path(os.getenv("DOPROS_TRANSCRIPTION_RESULT_PATH"))
 
 TRANSCRIPTION_RESULT_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+# Models are unloaded after this many idle seconds (src/residency.py)
+LLM_IDLE_SECONDS = int(os.getenv("DOPROS_LLM_IDLE_SECONDS", "600"))
+ASR_IDLE_SECONDS = int(os.getenv("DOPROS_ASR_IDLE_SECONDS", "900"))
+RESIDENCY_POLL_SECONDS = 30
@@ -0,0 +1,353 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.case import config
+from src.case.db import DATABASE_URL, AsyncDatabase, Database
+from src.case.entity import (
+    CaseEntity,
+    InfoUnitEntity,
+    InfoUnitMentionEntity,
+    TranscriptionEntity,
+)
+from src.case.dedupe import DedupeRegistry
+from src.case.fact_index import FactIndexRegistry
+from src.case.model import (
+    CaseHeader,
+    InfoUnitMatch,
+    TranscriptionHeader,
+    TranscriptionMatch,
+    TranscriptionModel,
+)
+from src.case.repository import (
+    CaseRepository,
+    InfoUnitRepository,
+    TranscriptionRepository,
+)
+
+# Async twins of the repositories in src/case/repository.py, for asyncio code.
+# Each call runs the sync repository method through AsyncSession.run_sync:
+# SQLAlchemy drives it on a greenlet over aiosqlite, so it awaits the database
+# instead of blocking a thread, and both APIs share one set of queries.
+
+# (sync session of the running call, whether it belongs to the caller)
+_current: ContextVar[Tuple[Session, bool]] = ContextVar("_current")
+
+_default_database: Optional[AsyncDatabase] = None
+
+
+def default_async_database() -> AsyncDatabase:
+    """One AsyncDatabase per process, so there is still a single writer."""
+    global _default_database
+    if _default_database is None:
+        _default_database = AsyncDatabase()
+    return _default_database
+
+
+class _RunSyncDatabase:
+    """
+    Stands in for Database inside run_sync: the sync repository gets the
+    session of the running call, and commits it where it would commit its
+    own, unless the session belongs to the caller's unit of work.
+    """
+
+    @contextmanager
+    def read(self, session: Optional[Session] = None):
+        yield session if session is not None else _current.get()[0]
+
+    @contextmanager
+    def write(self, session: Optional[Session] = None):
+        if session is not None:
+            yield session
+            return
+        session, joined = _current.get()
+        yield session
+        if not joined:
+            session.commit()
+
+
+def _call(session: Session, method, joined: bool, args, kwargs):
+    token = _current.set((session, joined))
+    try:
+        return method(*args, **kwargs)
+    finally:
+        _current.reset(token)
+
+
+class _AsyncRepository:
+    def __init__(self, database: Optional[AsyncDatabase]):
+        self.database = database or default_async_database()
+
+    async def _read(self, method, *args, session: Optional[AsyncSession] = None):
+        async with self.database.read(session) as async_session:
+            return await async_session.run_sync(
+                _call, method, session is not None, args, {}
+            )
+
+    async def _write(self, method, *args, session: Optional[AsyncSession] = None):
+        async with self.database.write(session) as async_session:
+            return await async_session.run_sync(
+                _call, method, session is not None, args, {}
+            )
+
+
+class AsyncTranscriptionRepository(_AsyncRepository):
+    def __init__(self, database: Optional[AsyncDatabase] = None):
+        super().__init__(database)
+        self.repository = TranscriptionRepository(_RunSyncDatabase())
+
+    async def get_transcription_by_id(
+        self, transcription_id: int, session: Optional[AsyncSession] = None
+    ) -> Optional[TranscriptionEntity]:
+        return await self._read(
+            self.repository.get_transcription_by_id, transcription_id, session=session
+        )
+
+    async def get_all_transcriptions(self) -> List[TranscriptionEntity]:
+        return await self._read(self.repository.get_all_transcriptions)
+
+    async def create_transcription(
+        self,
+        transcription_model: TranscriptionModel,
+        session: Optional[AsyncSession] = None,
+    ) -> TranscriptionEntity:
+        return await self._write(
+            self.repository.create_transcription, transcription_model, session=session
+        )
+
+    async def upsert_transcriptions(
+        self,
+        transcription_models: List[TranscriptionModel],
+        defaults: Optional[Dict] = None,
+    ) -> int:
+        return await self._write(
+            self.repository.upsert_transcriptions, transcription_models, defaults
+        )
+
+    async def update_transcription(self, transcription_id: int, updated_fields: dict):
+        return await self._write(
+            self.repository.update_transcription, transcription_id, updated_fields
+        )
+
+    async def get_transcriptions_by_case_id(
+        self, case_id: str
+    ) -> List[TranscriptionEntity]:
+        return await self._read(self.repository.get_transcriptions_by_case_id, case_id)
+
+    async def get_transcription_headers(
+        self,
+        case_id: str,
+        before_id: Optional[int] = None,
+        limit: int = config.LIST_PAGE_SIZE,
+    ) -> List[TranscriptionHeader]:
+        return await self._read(
+            self.repository.get_transcription_headers, case_id, before_id, limit
+        )
+
+    async def match_transcriptions(
+        self,
+        query: str,
+        case_id: Optional[str] = None,
+        offset: int = 0,
+        limit: int = config.SEARCH_PAGE_SIZE,
+    ) -> List[TranscriptionMatch]:
+        return await self._read(
+            self.repository.match_transcriptions, query, case_id, offset, limit
+        )
+
+    async def soft_delete_transcription(self, transcription_id: int) -> bool:
+        return await self._write(
+            self.repository.soft_delete_transcription, transcription_id
+        )
+
+
+class AsyncCaseRepository(_AsyncRepository):
+    def __init__(self, database: Optional[AsyncDatabase] = None):
+        super().__init__(database)
+        self.repository = CaseRepository(_RunSyncDatabase())
+
+    async def get_case_by_id(
+        self, case_id: str, session: Optional[AsyncSession] = None
+    ) -> Optional[CaseEntity]:
+        return await self._read(
+            self.repository.get_case_by_id, case_id, session=session
+        )
+
+    async def create_case(self, case_id: str, status: str) -> CaseEntity:
+        return await self._write(self.repository.create_case, case_id, status)
+
+    async def update_case(
+        self, case_id: str, updated_fields: dict
+    ) -> Optional[CaseEntity]:
+        return await self._write(self.repository.update_case, case_id, updated_fields)
+
+    async def soft_delete_case(self, case_id: str) -> bool:
+        return await self._write(self.repository.soft_delete_case, case_id)
+
+    async def get_case_list(self) -> List[CaseEntity]:
+        return await self._read(self.repository.get_case_list)
+
+    async def get_case_headers(
+        self, after_id: Optional[str] = None, limit: int = config.LIST_PAGE_SIZE
+    ) -> List[CaseHeader]:
+        return await self._read(self.repository.get_case_headers, after_id, limit)
+
+
+class AsyncInfoUnitRepository(_AsyncRepository):
+    """
+    The search and duplicate indexes are those of the sync repository on the
+    same database unless given, so both see every unit either creates. They
+    load cases through their own sync sessions and their work is CPU-bound
+    (BM25, embeddings, SimHash), so it runs in a worker thread, off the loop.
+    """
+
+    def __init__(
+        self,
+        database: Optional[AsyncDatabase] = None,
+        fact_indexes: Optional[FactIndexRegistry] = None,
+        dedupe: Optional[DedupeRegistry] = None,
+    ):
+        super().__init__(database)
+        if fact_indexes is None or dedupe is None:
+            if self.database.sync_url == DATABASE_URL:
+                loader = InfoUnitRepository(fact_indexes=fact_indexes, dedupe=dedupe)
+            else:
+                loader = InfoUnitRepository(
+                    Database(self.database.sync_url),
+                    fact_indexes=fact_indexes,
+                    dedupe=dedupe,
+                )
+            fact_indexes, dedupe = loader.fact_indexes, loader.dedupe
+        self.fact_indexes = fact_indexes
+        self.dedupe = dedupe
+        self.repository = InfoUnitRepository(
+            _RunSyncDatabase(), fact_indexes=fact_indexes, dedupe=dedupe
+        )
+
+    async def get_info_unit_by_id(
+        self, info_unit_id: int, session: Optional[AsyncSession] = None
+    ) -> Optional[InfoUnitEntity]:
+        return await self._read(
+            self.repository.get_info_unit_by_id, info_unit_id, session=session
+        )
+
+    async def get_info_units_by_case_id(self, case_id: str) -> List[InfoUnitEntity]:
+        return await self._read(self.repository.get_info_units_by_case_id, case_id)
+
+    async def get_info_units_by_ids(
+        self, info_unit_ids: List[int]
+    ) -> List[InfoUnitEntity]:
+        return await self._read(self.repository.get_info_units_by_ids, info_unit_ids)
+
+    async def search_info_units(
+        self, case_id: str, query: str, k: int
+    ) -> List[InfoUnitEntity]:
+        info_unit_ids = await asyncio.to_thread(
+            self.fact_indexes.search, case_id, query, k
+        )
+        return await self.get_info_units_by_ids(info_unit_ids)
+
+    async def match_info_units(
+        self,
+        query: str,
+        case_id: Optional[str] = None,
+        offset: int = 0,
+        limit: int = config.SEARCH_PAGE_SIZE,
+    ) -> List[InfoUnitMatch]:
+        return await self._read(
+            self.repository.match_info_units, query, case_id, offset, limit
+        )
+
+    async def get_info_units_by_transcription_id(
+        self, transcription_id: int
+    ) -> List[InfoUnitEntity]:
+        return await self._read(
+            self.repository.get_info_units_by_transcription_id, transcription_id
+        )
+
+    async def find_duplicate(self, case_id: str, text: str) -> Optional[InfoUnitEntity]:
+        info_unit_id = await asyncio.to_thread(self.dedupe.find, case_id, text)
+        if info_unit_id is None:
+            return None
+        return await self.get_info_unit_by_id(info_unit_id)
+
+    async def create_mention(
+        self, info_unit: InfoUnitEntity, transcription_id: int, text: str
+    ) -> InfoUnitMentionEntity:
+        return await self._write(
+            self.repository.create_mention, info_unit, transcription_id, text
+        )
+
+    async def create_info_units(
+        self,
+        case_id: str,
+        transcription_id: int,
+        facts: List[Tuple[str, str]],
+        status: str = "0",
+        session: Optional[AsyncSession] = None,
+    ) -> Tuple[List[InfoUnitEntity], List[InfoUnitEntity]]:
+        """
+        See InfoUnitRepository.create_info_units: within a caller's `session`
+        the caller indexes the new units once it has committed.
+        """
+        plan = await asyncio.to_thread(
+            self.repository.plan_info_units, case_id, transcription_id, facts, status
+        )
+        units, created = await self._write(
+            self._store_info_units,
+            case_id,
+            transcription_id,
+            facts,
+            plan,
+            status,
+            session=session,
+        )
+        if session is None:
+            await self.index_info_units(created)
+        return units, created
+
+    def _store_info_units(self, case_id, transcription_id, facts, plan, status):
+        return self.repository.store_info_units(
+            case_id, transcription_id, facts, plan, status, session=_current.get()[0]
+        )
+
+    async def index_info_units(self, units: List[InfoUnitEntity]):
+        await asyncio.to_thread(self.repository.index_info_units, units)
+
+    async def set_info_units_status(self, info_unit_ids: List[int], status: str) -> int:
+        return await self._write(
+            self.repository.set_info_units_status, info_unit_ids, status
+        )
+
+    async def create_info_unit(
+        self,
+        case_id: str,
+        transcription_id: int,
+        text: str,
+        language: str,
+        status: str = "0",
+    ) -> InfoUnitEntity:
+        units, _ = await self.create_info_units(
+            case_id, transcription_id, [(text, language)], status
+        )
+        return units[0]
+
+    async def update_info_unit(
+        self, info_unit_id: int, updated_fields: dict
+    ) -> Optional[InfoUnitEntity]:
+        info_unit = await self._write(
+            self.repository.update_info_unit_row, info_unit_id, updated_fields
+        )
+        if info_unit is not None and self.repository.changes_indexes(updated_fields):
+            await asyncio.to_thread(self.repository.reindex_info_units, [info_unit])
+        return info_unit
+
+    async def delete_info_unit(self, info_unit_id: int) -> bool:
+        deleted = await self._write(self.repository.delete_info_unit_rows, info_unit_id)
+        if deleted:
+            await asyncio.to_thread(self.repository.unindex_info_units, [info_unit_id])
+        return deleted
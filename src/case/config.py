@@ -1,6 +1,45 @@
+import os
+
 NETWORK_CHECK_URL = "http://example.com"  # Replace with a reliable URL
 API_URL = "http://your-server-address:port/getTranscriptionList"
 CHECK_INTERVAL = 10  # Seconds between network checks
 FETCH_INTERVAL = 20  # Seconds between transcription fetches
 MP3_SAVE_DIR = "mp3_files"
 SERVER_API_URL = "http://0.0.0.0:8000"
+# Log every SQL statement (slow, for debugging only)
+SQL_ECHO = os.getenv("DOPROS_SQL_ECHO", "0") == "1"
+
+# SQLite connections (src/case/db.py): one writer, a pool of readers
+DB_READ_POOL_SIZE = 4
+DB_BUSY_TIMEOUT_SECONDS = 10
+DB_WRITE_TIMEOUT_SECONDS = 30  # wait for the writer connection
+# NORMAL is durable in WAL mode except for the last commits on power loss
+SQLITE_SYNCHRONOUS = "NORMAL"
+SQLITE_CACHE_KIB = 16 << 10
+SQLITE_MMAP_BYTES = 256 << 20
+# Rows per page of the case and transcription lists (keyset pagination)
+LIST_PAGE_SIZE = 50
+# Full-text search (FTS5, migration v004): hits per page, words of context
+SEARCH_PAGE_SIZE = 20
+SEARCH_SNIPPET_WORDS = 12
+
+# Per-case fact retrieval (src/case/fact_index.py)
+FACT_SEARCH_TOP_K = 8
+# Stems shorter than this are not cut further when nltk is missing
+FACT_INDEX_MIN_STEM_LENGTH = 4
+# Optional local sentence-transformers model name/path for hybrid search
+FACT_EMBEDDING_MODEL = os.getenv("DOPROS_FACT_EMBEDDING_MODEL")
+
+# Near-duplicate facts (src/case/dedupe.py): SimHashes at most this many bits
+# apart are one fact if their numbers and negations agree; the bands must
+# outnumber the allowed distance
+DEDUPE_MAX_DISTANCE = 8
+DEDUPE_BANDS = 9
+DEDUPE_NEGATIONS = {"не", "нет", "ни", "никогда", "жоқ", "емес"}
+# ...and they have the same content words: only one-two letter words and
+# these may differ
+DEDUPE_MIN_JACCARD = 0.9
+DEDUPE_FUNCTION_WORDS = set(
+    "это что как так там тут уже еще вот тот при для про над под без через "
+    "когда также тоже бұл сол және мен".split()
+)
@@ -1,30 +1,183 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional
 
-from src.case.entity import Base, TranscriptionEntity, CaseEntity, InfoUnitEntity
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 
-DATABASE_URL = "sqlite:///transcriptions.db"
+from src.case import config
+from src.case.migrations import migrate
 
-engine = create_engine(DATABASE_URL, echo=True, future=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Session = scoped_session(SessionLocal)
+DATABASE_PATH = "transcriptions.db"
+DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
 
 
-def get_db_session():
-    db = Session()
-    try:
-        yield db
-    finally:
-        db.close()
+def _configure_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL: readers see the last commit and never wait for the writer
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute(f"PRAGMA synchronous = {config.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size = -{config.SQLITE_CACHE_KIB}")
+    cursor.execute(f"PRAGMA mmap_size = {config.SQLITE_MMAP_BYTES}")
+    cursor.execute(f"PRAGMA busy_timeout = {config.DB_BUSY_TIMEOUT_SECONDS * 1000}")
+    cursor.close()
+
+
+class Database:
+    """
+    SQLite in WAL mode with one writer and many readers.
+
+    All writes go through a single pooled connection, so concurrent writers
+    queue here instead of failing with "database is locked"; reads use a pool
+    of their own. Every operation runs in a short-lived session, and objects
+    stay readable after it closes (expire_on_commit=False).
+    """
+
+    def __init__(self, url: str = DATABASE_URL):
+        self.write_engine = self._create_engine(
+            url, pool_size=1, pool_timeout=config.DB_WRITE_TIMEOUT_SECONDS
+        )
+        self.read_engine = self._create_engine(url, pool_size=config.DB_READ_POOL_SIZE)
+        self._write_sessions = sessionmaker(
+            bind=self.write_engine, autoflush=False, expire_on_commit=False
+        )
+        self._read_sessions = sessionmaker(
+            bind=self.read_engine, autoflush=False, expire_on_commit=False
+        )
+
+    @staticmethod
+    def _create_engine(url: str, pool_size: int, pool_timeout: float = 30):
+        engine = create_engine(
+            url,
+            echo=config.SQL_ECHO,
+            future=True,
+            pool_size=pool_size,
+            max_overflow=0,
+            pool_timeout=pool_timeout,
+            connect_args={
+                "timeout": config.DB_BUSY_TIMEOUT_SECONDS,
+                "check_same_thread": False,
+            },
+        )
+        event.listen(engine, "connect", _configure_connection)
+        return engine
+
+    @contextmanager
+    def read(self, session: Optional[Session] = None) -> Iterator[Session]:
+        """Session for reads; an open `session` (e.g. a write) is reused."""
+        if session is not None:
+            yield session
+            return
+        session = self._read_sessions()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    @contextmanager
+    def write(self, session: Optional[Session] = None) -> Iterator[Session]:
+        """
+        Unit of work on the writer connection, committed when the block ends
+        and rolled back on error. Inside an open `session` it joins that one,
+        which then commits.
+        """
+        if session is not None:
+            yield session
+            return
+        session = self._write_sessions()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def dispose(self):
+        self.write_engine.dispose()
+        self.read_engine.dispose()
+
+
+class AsyncDatabase:
+    """
+    Database for asyncio code, on aiosqlite: the same pragmas and the same
+    single writer and reader pool, but waiting for a connection or a query
+    suspends the coroutine instead of blocking its thread.
+    """
+
+    def __init__(self, url: str = ASYNC_DATABASE_URL):
+        # The same file for sync code, such as the search index loaders
+        self.sync_url = url.replace("+aiosqlite", "", 1)
+        self.write_engine = self._create_engine(
+            url, pool_size=1, pool_timeout=config.DB_WRITE_TIMEOUT_SECONDS
+        )
+        self.read_engine = self._create_engine(url, pool_size=config.DB_READ_POOL_SIZE)
+        self._write_sessions = async_sessionmaker(
+            bind=self.write_engine, autoflush=False, expire_on_commit=False
+        )
+        self._read_sessions = async_sessionmaker(
+            bind=self.read_engine, autoflush=False, expire_on_commit=False
+        )
+
+    @staticmethod
+    def _create_engine(url: str, pool_size: int, pool_timeout: float = 30):
+        engine = create_async_engine(
+            url,
+            echo=config.SQL_ECHO,
+            pool_size=pool_size,
+            max_overflow=0,
+            pool_timeout=pool_timeout,
+            connect_args={"timeout": config.DB_BUSY_TIMEOUT_SECONDS},
+        )
+        event.listen(engine.sync_engine, "connect", _configure_connection)
+        return engine
+
+    @asynccontextmanager
+    async def read(
+        self, session: Optional[AsyncSession] = None
+    ) -> AsyncIterator[AsyncSession]:
+        """See Database.read."""
+        if session is not None:
+            yield session
+            return
+        async with self._read_sessions() as session:
+            yield session
+
+    @asynccontextmanager
+    async def write(
+        self, session: Optional[AsyncSession] = None
+    ) -> AsyncIterator[AsyncSession]:
+        """See Database.write."""
+        if session is not None:
+            yield session
+            return
+        async with self._write_sessions() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def dispose(self):
+        await self.write_engine.dispose()
+        await self.read_engine.dispose()
+
+
+database = Database()
 
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    """Create the database or upgrade it to the current schema version."""
+    return migrate(DATABASE_PATH)
 
 
 if __name__ == "__main__":
     import os
+    import sys
 
-    if os.path.exists("transcriptions.db"):
-        os.remove("transcriptions.db")
-    init_db()
+    if "--reset" in sys.argv and os.path.exists(DATABASE_PATH):
+        os.remove(DATABASE_PATH)
+    print(f"Schema version {init_db()}")
@@ -0,0 +1,247 @@
+import hashlib
+import re
+import sys
+import threading
+from collections import Counter, defaultdict
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from src.case import config
+from src.case.entity import InfoUnitEntity
+from src.case.fact_index import stem, tokenize
+
+_NON_WORD = re.compile(r"[^\w]+")
+_BITS = 64
+_FUNCTION_WORDS = {stem(word) for word in config.DEDUPE_FUNCTION_WORDS}
+
+
+def normalize(text: str) -> str:
+    """Lowercase, ё → е, punctuation and repeated whitespace removed."""
+    text = text.lower().replace("ё", "е")
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def text_hash(text: str) -> str:
+    """Hash of the normalized text: equal for facts that differ only in form."""
+    return hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()
+
+
+def simhash(text: str) -> int:
+    """
+    64-bit SimHash over stemmed words and word pairs; rewordings of the same
+    statement differ in only a few bits.
+    """
+    terms = tokenize(text)
+    features = terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+    weights = [0] * _BITS
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "big")
+        for bit in range(_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(_BITS) if weights[bit] > 0)
+
+
+def to_signed(value: int) -> int:
+    """SimHash as a signed 64-bit integer, the range SQLite can store."""
+    return value - (1 << _BITS) if value >= 1 << (_BITS - 1) else value
+
+
+def fingerprint(text: str) -> Tuple[str, int]:
+    """(text_hash, signed simhash) stored with every info unit."""
+    return text_hash(text), to_signed(simhash(text))
+
+
+def key_terms(text: str) -> FrozenSet[str]:
+    """
+    Numbers and negations: a fact that changes one of them states something
+    else, however close its SimHash.
+    """
+    return frozenset(
+        word
+        for word in normalize(text).split()
+        if word.isdigit() or word in config.DEDUPE_NEGATIONS
+    )
+
+
+def content_words(text: str) -> Counter:
+    """Stemmed words of `text` without function words, with their counts."""
+    return Counter(
+        word
+        for word in tokenize(text)
+        if word.isdigit() or len(word) > 2 and word not in _FUNCTION_WORDS
+    )
+
+
+def same_words(a: Counter, b: Counter) -> bool:
+    """
+    Content words (see content_words) of two facts that state the same thing:
+    the same words, repeated alike (Jaccard similarity of at least
+    DEDUPE_MIN_JACCARD). One changed word ("черной"/"синей куртке") is another
+    statement, however few SimHash bits it flips.
+    """
+    if a.keys() != b.keys():
+        return False
+    union = sum((a | b).values())
+    return union > 0 and sum((a & b).values()) / union >= config.DEDUPE_MIN_JACCARD
+
+
+class DedupeIndex:
+    """
+    Exact normalized-hash lookup plus SimHash near-duplicate search over the
+    facts of one case. The 64 bits are split into bands; two hashes within
+    DEDUPE_MAX_DISTANCE bits share at least one band exactly, so only facts
+    in a matching band bucket are compared, and only those with the same
+    key terms and the same words (see same_words) count.
+    """
+
+    def __init__(
+        self,
+        max_distance: int = config.DEDUPE_MAX_DISTANCE,
+        bands: int = config.DEDUPE_BANDS,
+    ):
+        self.max_distance = max_distance
+        self.bands = bands
+        self.band_bits = _BITS // bands
+        self.by_hash: Dict[str, int] = {}
+        self.hashes: Dict[int, str] = {}
+        self.simhashes: Dict[int, int] = {}
+        self.key_terms: Dict[int, FrozenSet[str]] = {}
+        self.words: Dict[int, Counter] = {}
+        self.buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+
+    def __len__(self):
+        return len(self.simhashes)
+
+    def add(self, unit_id: int, text: str, hash_: str, simhash_: int):
+        simhash_ &= (1 << _BITS) - 1
+        self.by_hash.setdefault(hash_, unit_id)
+        self.hashes[unit_id] = hash_
+        self.simhashes[unit_id] = simhash_
+        self.key_terms[unit_id] = key_terms(text)
+        self.words[unit_id] = content_words(text)
+        for band in self._bands(simhash_):
+            self.buckets[band].append(unit_id)
+
+    def remove(self, unit_id: int):
+        simhash_ = self.simhashes.pop(unit_id, None)
+        if simhash_ is None:
+            return
+        hash_ = self.hashes.pop(unit_id)
+        if self.by_hash.get(hash_) == unit_id:
+            del self.by_hash[hash_]
+            # A unit stored with the same text before dedupe existed
+            for other_id, other_hash in self.hashes.items():
+                if other_hash == hash_:
+                    self.by_hash[hash_] = other_id
+                    break
+        del self.key_terms[unit_id]
+        del self.words[unit_id]
+        for band in self._bands(simhash_):
+            self.buckets[band].remove(unit_id)
+
+    def find(self, text: str, hash_: str, simhash_: int) -> Optional[int]:
+        """Id of a stored fact that duplicates `text`, if any."""
+        if hash_ in self.by_hash:
+            return self.by_hash[hash_]
+        simhash_ &= (1 << _BITS) - 1
+        terms = key_terms(text)
+        words = content_words(text)
+        best, best_distance = None, self.max_distance + 1
+        for band in self._bands(simhash_):
+            for unit_id in self.buckets.get(band, ()):
+                if self.key_terms[unit_id] != terms:
+                    continue
+                distance = bin(self.simhashes[unit_id] ^ simhash_).count("1")
+                if distance < best_distance and same_words(self.words[unit_id], words):
+                    best, best_distance = unit_id, distance
+        return best
+
+    def _bands(self, value: int):
+        mask = (1 << self.band_bits) - 1
+        for band in range(self.bands):
+            yield band, value >> (band * self.band_bits) & mask
+
+
+class DedupeRegistry:
+    """
+    One DedupeIndex per case, built from the database on first check and
+    kept up to date as info units are created, edited and deleted.
+    """
+
+    def __init__(self, load_case_units: Callable[[str], List[InfoUnitEntity]]):
+        self.load_case_units = load_case_units
+        self._indexes: Dict[str, DedupeIndex] = {}
+        self._lock = threading.Lock()
+
+    def find(self, case_id: str, text: str) -> Optional[int]:
+        hash_, simhash_ = fingerprint(text)
+        index = self._get(case_id)
+        with self._lock:
+            return index.find(text, hash_, simhash_)
+
+    def add(self, unit: InfoUnitEntity):
+        # Cases that were never checked are indexed from the DB on first use
+        with self._lock:
+            index = self._indexes.get(unit.case_id)
+            if index is not None:
+                index.add(unit.id, unit.text, *self._fingerprint(unit))
+
+    def remove(self, unit_id: int):
+        # Unit ids are unique across cases, and the unit may have moved
+        with self._lock:
+            for index in self._indexes.values():
+                index.remove(unit_id)
+
+    def _get(self, case_id: str) -> DedupeIndex:
+        with self._lock:
+            if case_id not in self._indexes:
+                index = DedupeIndex()
+                for unit in self.load_case_units(case_id):
+                    index.add(unit.id, unit.text, *self._fingerprint(unit))
+                self._indexes[case_id] = index
+            return self._indexes[case_id]
+
+    @staticmethod
+    def _fingerprint(unit: InfoUnitEntity) -> Tuple[str, int]:
+        # Units stored before fingerprints were kept get them computed here
+        if unit.text_hash is None or unit.simhash is None:
+            return fingerprint(unit.text)
+        return unit.text_hash, unit.simhash
+
+
+# Statements that must stay apart, and rewordings that must be linked
+_CONTRADICTING = [
+    (
+        "Свидетель видел мужчину в черной куртке возле подъезда дома номер пять",
+        "Свидетель видел мужчину в синей куртке возле подъезда дома номер пять",
+    ),
+    (
+        "После ссоры подозреваемый сел в такси и уехал в сторону вокзала",
+        "После ссоры подозреваемый сел в такси и уехал в сторону аэропорта",
+    ),
+    ("Потерпевшая вернулась домой в 22 часа", "Потерпевшая вернулась домой в 23 часа"),
+    ("Свидетель видел машину ночью", "Свидетель не видел машину ночью"),
+]
+_DUPLICATES = [
+    ("Свидетель видел машину ночью.", "свидетель видел машину ночью"),
+    (
+        "Подозреваемый уехал на такси в сторону вокзала",
+        "И подозреваемый уехал на такси в сторону вокзала",
+    ),
+]
+
+
+def _linked(stored: str, repeat: str) -> bool:
+    index = DedupeIndex()
+    index.add(1, stored, *fingerprint(stored))
+    return index.find(repeat, *fingerprint(repeat)) is not None
+
+
+if __name__ == "__main__":
+    failures = [pair for pair in _CONTRADICTING if _linked(*pair)]
+    failures += [pair for pair in _DUPLICATES if not _linked(*pair)]
+    for stored, repeat in failures:
+        print(f"Wrong: {stored!r} / {repeat!r}")
+    if failures:
+        sys.exit(f"{len(failures)} fact pairs deduplicated wrongly.")
+    print("Contradicting facts stay apart, rewordings are linked.")
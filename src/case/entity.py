@@ -1,8 +1,9 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
 from datetime import datetime
 from src.case.enums import TranscriptionStatus
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import declarative_base, deferred
 
+# The schema, indexes included, is created by src/case/migrations
 Base = declarative_base()
 
 
@@ -14,8 +15,11 @@ class TranscriptionEntity(Base):
     title = Column(String, nullable=False)
     description = Column(String, nullable=True)
     mp3_url = Column(String, nullable=True)
-    full_text = Column(Text, nullable=True)
-    improved_text = Column(Text, nullable=True)
+    # The large texts load only when accessed, or with undefer_group("text")
+    full_text = deferred(Column(Text, nullable=True), group="text")
+    improved_text = deferred(Column(Text, nullable=True), group="text")
+    # JSON list of ASR segments with per-word confidences and timestamps
+    segments = deferred(Column(Text, nullable=True), group="text")
     status = Column(String, nullable=False, default=TranscriptionStatus.RECEIVED.value)
     is_deleted = Column(Boolean, default=False, nullable=False)
     create_date = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -50,9 +54,31 @@ class InfoUnitEntity(Base):
     text = Column(String, nullable=False)
     language = Column(String(10), nullable=False)
     status = Column(String, default="unverified", nullable=False)
+    # Fingerprints for duplicate checks (src/case/dedupe.py)
+    text_hash = Column(String(40), nullable=True)
+    simhash = Column(Integer, nullable=True)
 
     def __repr__(self):
         return (
             f"<InfoUnitEntity(id={self.id}, case_id='{self.case_id}', transcription_id={self.transcription_id}, "
             f"text='{self.text}', language='{self.language}', status='{self.status}')>"
         )
+
+
+class InfoUnitMentionEntity(Base):
+    """A repeated statement of an info unit, linked instead of stored again."""
+
+    __tablename__ = "info_unit_mentions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    info_unit_id = Column(Integer, nullable=False)
+    case_id = Column(String, nullable=False)
+    transcription_id = Column(Integer, nullable=False)
+    text = Column(String, nullable=False)
+    create_date = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<InfoUnitMentionEntity(id={self.id}, info_unit_id={self.info_unit_id}, "
+            f"transcription_id={self.transcription_id}, text='{self.text}')>"
+        )
@@ -0,0 +1,208 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set
+
+import numpy as np
+
+from src.case import config
+from src.case.entity import InfoUnitEntity
+
+_WORD = re.compile(r"\w+")
+
+
+def _load_stemmer():
+    try:
+        from nltk.stem.snowball import SnowballStemmer
+    except ImportError:
+        print("nltk not installed, fact search strips word endings by length.")
+        return None
+    return SnowballStemmer("russian")
+
+
+_STEMMER = _load_stemmer()
+
+
+@lru_cache(maxsize=1 << 16)
+def stem(word: str) -> str:
+    """
+    Russian Snowball stem of a lowercased word ("машину", "машина" -> "машин").
+    Without nltk, the last two letters are dropped from words of 6+ letters.
+    Kazakh words keep any ending the Russian rules don't know.
+    """
+    if _STEMMER is not None:
+        return _STEMMER.stem(word)
+    return word[: max(config.FACT_INDEX_MIN_STEM_LENGTH, len(word) - 2)]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, stemmed word tokens, ё read as е."""
+    text = text.lower().replace("ё", "е")
+    return [stem(word) for word in _WORD.findall(text)]
+
+
+def load_embedder(model_name: Optional[str] = config.FACT_EMBEDDING_MODEL):
+    """Local sentence-embedding model, or None when not configured/installed."""
+    if not model_name:
+        return None
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        print("sentence-transformers not installed, fact search uses BM25 only.")
+        return None
+    return SentenceTransformer(model_name, device="cpu")
+
+
+class FactIndex:
+    """
+    Incremental BM25 index over the facts of one case, optionally combined with
+    cosine similarity over a compact float16 matrix of sentence embeddings.
+    Removed facts keep their row, which no search returns.
+    """
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, embedder=None):
+        self.embedder = embedder
+        self.ids: List[int] = []
+        self.docs: Dict[int, int] = {}
+        self.removed: Set[int] = set()
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.total_length = 0
+        self.embeddings: Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.ids) - len(self.removed)
+
+    def add(self, unit_id: int, text: str):
+        self.add_many([unit_id], [text])
+
+    def add_many(self, unit_ids: List[int], texts: List[str]):
+        first_doc = len(self.ids)
+        for unit_id, text in zip(unit_ids, texts):
+            doc = len(self.ids)
+            terms = Counter(tokenize(text))
+            for term, tf in terms.items():
+                self.postings[term][doc] = tf
+            self.docs[unit_id] = doc
+            self.ids.append(unit_id)
+            self.doc_lengths.append(sum(terms.values()))
+            self.total_length += self.doc_lengths[-1]
+
+        if self.embedder is not None and texts:
+            for offset, vector in enumerate(self._embed(texts)):
+                self._add_embedding(vector, first_doc + offset)
+
+    def remove(self, unit_id: int):
+        doc = self.docs.pop(unit_id, None)
+        if doc is None:
+            return
+        for postings in self.postings.values():
+            postings.pop(doc, None)
+        self.total_length -= self.doc_lengths[doc]
+        self.doc_lengths[doc] = 0
+        self.removed.add(doc)
+
+    def search(self, query: str, k: int = config.FACT_SEARCH_TOP_K) -> List[int]:
+        """Ids of the `k` facts most relevant to `query`, best first."""
+        if not len(self):
+            return []
+
+        scores = self._bm25(query)
+        if self.embedder is not None and self.embeddings is not None:
+            if scores.max() > 0:
+                scores = scores / scores.max()
+            vectors = self.embeddings[: len(self.ids)].astype(np.float32)
+            scores = scores + vectors @ self._embed([query])[0]
+            scores[list(self.removed)] = 0
+
+        k = min(k, len(self.ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.ids[doc] for doc in top if scores[doc] > 0]
+
+    def _bm25(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        avg_length = self.total_length / len(self) or 1.0
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(
+                1 + (len(self) - len(postings) + 0.5) / (len(postings) + 0.5)
+            )
+            for doc, tf in postings.items():
+                norm = self.K1 * (
+                    1 - self.B + self.B * self.doc_lengths[doc] / avg_length
+                )
+                scores[doc] += idf * tf * (self.K1 + 1) / (tf + norm)
+        return scores
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(
+            self.embedder.encode(texts, normalize_embeddings=True), dtype=np.float32
+        )
+
+    def _add_embedding(self, vector: np.ndarray, row: int):
+        if self.embeddings is None:
+            self.embeddings = np.zeros((16, vector.shape[0]), dtype=np.float16)
+        elif row >= self.embeddings.shape[0]:
+            grown = np.zeros(
+                (max(self.embeddings.shape[0] * 2, row + 1), vector.shape[0]),
+                dtype=np.float16,
+            )
+            grown[:row] = self.embeddings[:row]
+            self.embeddings = grown
+        self.embeddings[row] = vector
+
+
+class FactIndexRegistry:
+    """
+    One FactIndex per case, built from the database on first search and kept
+    up to date as info units are created, edited and deleted.
+    """
+
+    def __init__(
+        self,
+        load_case_units: Callable[[str], List[InfoUnitEntity]],
+        embedder=None,
+    ):
+        self.load_case_units = load_case_units
+        self.embedder = embedder
+        self._indexes: Dict[str, FactIndex] = {}
+        self._lock = threading.Lock()
+
+    def get(self, case_id: str) -> FactIndex:
+        with self._lock:
+            if case_id not in self._indexes:
+                units = self.load_case_units(case_id)
+                index = FactIndex(self.embedder)
+                index.add_many(
+                    [unit.id for unit in units], [unit.text for unit in units]
+                )
+                self._indexes[case_id] = index
+            return self._indexes[case_id]
+
+    def add(self, unit: InfoUnitEntity):
+        # Cases that were never searched are indexed from the DB on first use
+        with self._lock:
+            index = self._indexes.get(unit.case_id)
+            if index is not None:
+                index.add(unit.id, unit.text)
+
+    def remove(self, unit_id: int):
+        # Unit ids are unique across cases, and the unit may have moved
+        with self._lock:
+            for index in self._indexes.values():
+                index.remove(unit_id)
+
+    def search(
+        self, case_id: str, query: str, k: int = config.FACT_SEARCH_TOP_K
+    ) -> List[int]:
+        index = self.get(case_id)
+        with self._lock:
+            return index.search(query, k)
@@ -0,0 +1,50 @@
+"""
+Versioned schema migrations. Each vNNN_*.py module has an `upgrade(conn)`
+that takes a sqlite3 connection; PRAGMA user_version records the last one
+applied to a database.
+"""
+
+import sqlite3
+from contextlib import closing
+
+from src.case.migrations import (
+    v001_initial_schema,
+    v002_segments_and_dedupe,
+    v003_query_indexes,
+    v004_full_text_search,
+)
+
+MIGRATIONS = [
+    v001_initial_schema,
+    v002_segments_and_dedupe,
+    v003_query_indexes,
+    v004_full_text_search,
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(database_path: str) -> int:
+    """Apply the pending migrations in order, each in its own transaction."""
+    # isolation_level=None: the transactions below are explicit, DDL included
+    with closing(sqlite3.connect(database_path, isolation_level=None)) as conn:
+        version = schema_version(conn)
+        if version > len(MIGRATIONS):
+            raise RuntimeError(
+                f"Database schema version {version} is newer than this build "
+                f"({len(MIGRATIONS)})"
+            )
+
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                migration.upgrade(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            print(f"Database migrated to version {number}: {migration.__doc__}")
+        return len(MIGRATIONS)
@@ -0,0 +1,47 @@
+"""Tables as created by Base.metadata.create_all before migrations existed."""
+
+# IF NOT EXISTS: databases created by create_all already have them
+
+
+def upgrade(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS transcriptions (
+            id INTEGER NOT NULL,
+            case_id VARCHAR NOT NULL,
+            title VARCHAR NOT NULL,
+            description VARCHAR,
+            mp3_url VARCHAR,
+            full_text TEXT,
+            improved_text TEXT,
+            status VARCHAR NOT NULL,
+            is_deleted BOOLEAN NOT NULL,
+            create_date DATETIME NOT NULL,
+            update_date DATETIME NOT NULL,
+            PRIMARY KEY (id)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS cases (
+            id VARCHAR NOT NULL,
+            status INTEGER NOT NULL,
+            create_date DATETIME NOT NULL,
+            PRIMARY KEY (id)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS info_units (
+            id INTEGER NOT NULL,
+            case_id VARCHAR NOT NULL,
+            transcription_id INTEGER NOT NULL,
+            text VARCHAR NOT NULL,
+            language VARCHAR(10) NOT NULL,
+            status VARCHAR NOT NULL,
+            PRIMARY KEY (id)
+        )
+        """
+    )
@@ -0,0 +1,42 @@
+"""ASR segments on transcriptions, fact fingerprints and info_unit_mentions."""
+
+
+def _add_column(conn, table, column, ddl):
+    # Databases recreated with create_all after the entity changed have it
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+def upgrade(conn):
+    _add_column(conn, "transcriptions", "segments", "TEXT")
+    _add_column(conn, "info_units", "text_hash", "VARCHAR(40)")
+    _add_column(conn, "info_units", "simhash", "INTEGER")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS info_unit_mentions (
+            id INTEGER NOT NULL,
+            info_unit_id INTEGER NOT NULL,
+            case_id VARCHAR NOT NULL,
+            transcription_id INTEGER NOT NULL,
+            text VARCHAR NOT NULL,
+            create_date DATETIME NOT NULL,
+            PRIMARY KEY (id)
+        )
+        """
+    )
+    _backfill_fingerprints(conn)
+
+
+def _backfill_fingerprints(conn):
+    # Units stored before dedupe, so DedupeRegistry need not hash them on every
+    # load. Imported here: src.case.db imports the migrations.
+    from src.case.dedupe import fingerprint
+
+    rows = conn.execute(
+        "SELECT id, text FROM info_units WHERE text_hash IS NULL OR simhash IS NULL"
+    ).fetchall()
+    conn.executemany(
+        "UPDATE info_units SET text_hash = ?, simhash = ? WHERE id = ?",
+        [(*fingerprint(text), unit_id) for unit_id, text in rows],
+    )
@@ -0,0 +1,22 @@
+"""Indexes for the repository queries (checked by src/case/query_plans.py)."""
+
+_INDEXES = [
+    # Live transcriptions of a case; the filter matches SQLAlchemy's rendering
+    # of `is_deleted == False`, so deleted rows stay out of the index
+    "CREATE INDEX IF NOT EXISTS ix_transcriptions_case_live"
+    " ON transcriptions (case_id) WHERE is_deleted = 0",
+    "CREATE INDEX IF NOT EXISTS ix_info_units_case_id ON info_units (case_id)",
+    "CREATE INDEX IF NOT EXISTS ix_info_units_transcription_id"
+    " ON info_units (transcription_id)",
+    # Covers the "units repeated in a transcription" subquery
+    "CREATE INDEX IF NOT EXISTS ix_info_unit_mentions_transcription"
+    " ON info_unit_mentions (transcription_id, info_unit_id)",
+    # Mentions deleted with their unit
+    "CREATE INDEX IF NOT EXISTS ix_info_unit_mentions_info_unit"
+    " ON info_unit_mentions (info_unit_id)",
+]
+
+
+def upgrade(conn):
+    for statement in _INDEXES:
+        conn.execute(statement)
@@ -0,0 +1,54 @@
+"""FTS5 full-text indexes over transcription texts and info units."""
+
+# unicode61 folds case for Cyrillic too. remove_diacritics 0 keeps й apart
+# from и; ё is folded to е here instead, in what the triggers index, and in
+# src/case/search.py for queries. The Kazakh letters are separate code points
+# and need no handling.
+_TOKENIZE = "tokenize = 'unicode61 remove_diacritics 0'"
+
+
+def _fold(column):
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def _index_table(conn, fts, table, columns):
+    """
+    External-content FTS5 table over `columns` of `table`, kept in sync by
+    triggers. A 'delete' must repeat the values that were indexed, so both
+    sides fold the same way.
+    """
+    names = ", ".join(columns)
+    conn.execute(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5("
+        f"{names}, content = '{table}', content_rowid = 'id', {_TOKENIZE})"
+    )
+
+    def values(row):
+        return ", ".join(_fold(f"{row}.{column}") for column in columns)
+
+    insert = f"INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {values('new')});"
+    delete = (
+        f"INSERT INTO {fts} ({fts}, rowid, {names})"
+        f" VALUES ('delete', old.id, {values('old')});"
+    )
+    conn.execute(f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END")
+    conn.execute(f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END")
+    conn.execute(
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {table}"
+        f" BEGIN {delete} {insert} END"
+    )
+    # 'rebuild' would index the unfolded texts
+    conn.execute(
+        f"INSERT INTO {fts} (rowid, {names})"
+        f" SELECT id, {values(table)} FROM {table}"
+    )
+
+
+def upgrade(conn):
+    _index_table(
+        conn,
+        "transcriptions_fts",
+        "transcriptions",
+        ["title", "full_text", "improved_text"],
+    )
+    _index_table(conn, "info_units_fts", "info_units", ["text"])
@@ -3,6 +3,7 @@ from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 from src.case.enums import TranscriptionStatus
 from enum import Enum
+from typing import NamedTuple, Optional
 
 Base = declarative_base()  # Use SQLAlchemy's declarative base
 
@@ -17,6 +18,7 @@ class TranscriptionModel(Base):
     mp3_url = Column(String, nullable=True)
     full_text = Column(String, nullable=True)
     improved_text = Column(String, nullable=True)
+    segments = Column(String, nullable=True)
     status = Column(String, default=TranscriptionStatus.RECEIVED, nullable=False)
     is_deleted = Column(Boolean, default=False)
     create_date = Column(DateTime, default=datetime.utcnow)
@@ -47,3 +49,34 @@ class InfoUnitModel(Base):
     text = Column(String, nullable=False)
     language = Column(String(10), nullable=False)
     status = Column(String, default="unverified", nullable=False)
+
+
+class TranscriptionHeader(NamedTuple):
+    """What a transcription list shows; the texts are fetched on selection."""
+
+    id: int
+    title: str
+    status: str
+    create_date: Optional[datetime]
+
+
+class CaseHeader(NamedTuple):
+    id: str
+    status: int
+
+
+class TranscriptionMatch(NamedTuple):
+    """Full-text search hit; `snippet` marks the matched words with [ ]."""
+
+    id: int
+    case_id: str
+    title: str
+    snippet: str
+
+
+class InfoUnitMatch(NamedTuple):
+    id: int
+    case_id: str
+    transcription_id: int
+    text: str
+    snippet: str
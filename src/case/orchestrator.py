@@ -1,11 +1,11 @@
 import threading
 import time
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 import requests
 
 from src.case import config
-from src.case.db import get_db_session
+from src.case.db import database, init_db
 from src.case.network_service import NetworkService
 from src.case.transcription_service import TranscriptionService
 from src.case.repository import (
@@ -18,12 +18,14 @@ from src.case.repository import (
 class Orchestrator:
 
     def __init__(self):
-        db_session = next(get_db_session())
-        transcription_repo = TranscriptionRepository(db_session)
+        init_db()
+        # Repositories open a short session per operation, so the Tk thread,
+        # the recorder and post-analysis never share one
+        transcription_repo = TranscriptionRepository(database)
 
-        self.case_repo = CaseRepository(next(get_db_session()))
+        self.case_repo = CaseRepository(database)
 
-        self.info_unit_repo = InfoUnitRepository(next(get_db_session()))
+        self.info_unit_repo = InfoUnitRepository(database)
 
         self.transcription_service = TranscriptionService(transcription_repo)
         self.network_service = NetworkService()
@@ -45,6 +47,18 @@ class Orchestrator:
             print(f"No transcriptions found for case ID {case_id}.")
             return []
 
+    def fetch_transcription_headers(
+        self, case_id: str, before_id: Optional[int] = None
+    ):
+        """A page of the case's transcription list; see TranscriptionHeader."""
+        return self.transcription_service.get_transcription_headers(
+            case_id, before_id=before_id
+        )
+
+    def get_transcription(self, transcription_id: int):
+        """A single transcription with its texts, e.g. the one selected in a list."""
+        return self.transcription_service.get_transcription(transcription_id)
+
     def create_transcription(self, data: Dict):
         entity = self.transcription_service.create_new_transcription(data)
         print(f"Transcription {entity.id} created successfully.")
@@ -59,20 +73,99 @@ class Orchestrator:
     def get_case_list(self):
         return self.case_repo.get_case_list()
 
+    def get_case_headers(self, after_id: Optional[str] = None):
+        """A page of the case list, ordered by case id."""
+        return self.case_repo.get_case_headers(after_id=after_id)
+
     def get_info_unit_list(self, case_id: str):
         return self.info_unit_repo.get_info_units_by_case_id(case_id=case_id)
 
+    def search_info_units(
+        self, case_id: str, query: str, k: int = config.FACT_SEARCH_TOP_K
+    ):
+        """Facts of the case most relevant to `query`, best first."""
+        return self.info_unit_repo.search_info_units(case_id, query, k)
+
+    def find_transcriptions(
+        self, query: str, case_id: Optional[str] = None, page: int = 0
+    ):
+        """
+        Full-text search for `query` in transcriptions, of one case or of all,
+        one ranked page of TranscriptionMatch at a time.
+        """
+        return self.transcription_service.match_transcriptions(
+            query, case_id, offset=page * config.SEARCH_PAGE_SIZE
+        )
+
+    def find_info_units(self, query: str, case_id: Optional[str] = None, page: int = 0):
+        """Full-text search over facts; see find_transcriptions."""
+        return self.info_unit_repo.match_info_units(
+            query, case_id, offset=page * config.SEARCH_PAGE_SIZE
+        )
+
+    def get_related_info_units(
+        self, case_id: str, transcription_id: int, k: int = config.FACT_SEARCH_TOP_K
+    ):
+        """
+        Facts of a transcription plus, for each of them, the top-k related facts
+        from the rest of the case: the input for a focused contradiction check.
+        """
+        own = self.info_unit_repo.get_info_units_by_transcription_id(transcription_id)
+        related = {unit.id: unit for unit in own}
+        for unit in own:
+            for match in self.info_unit_repo.search_info_units(case_id, unit.text, k):
+                related.setdefault(match.id, match)
+        return list(related.values())
+
     def create_info_unit(
         self, case_id: str, transcription_id: int, text: str, language: str
     ):
-        entity = self.info_unit_repo.create_info_unit(
-            case_id=case_id,
-            transcription_id=transcription_id,
-            text=text,
-            language=language,
-            status="0",
+        """
+        Store a fact, unless the case already has the same or a near-identical
+        one: then the repeat is only linked to it and the existing unit returned.
+        """
+        units = self.create_info_units(case_id, transcription_id, [(text, language)])
+        return units[0]
+
+    def create_info_units(
+        self, case_id: str, transcription_id: int, facts: List[Tuple[str, str]]
+    ):
+        """Store many (text, language) facts in one transaction; see create_info_unit."""
+        units, created = self.info_unit_repo.create_info_units(
+            case_id, transcription_id, facts
+        )
+        self._report_info_units(units, created)
+        return units
+
+    def save_session(self, transcription: Dict, facts: List[Tuple[str, str]]):
+        """
+        Store a recording session's transcription and all its (text, language)
+        facts in one transaction. Returns (transcription, unit of every fact).
+        """
+        with database.write() as session:
+            entity = self.transcription_service.create_new_transcription(
+                transcription, session=session
+            )
+            units, created = self.info_unit_repo.create_info_units(
+                entity.case_id, entity.id, facts, session=session
+            )
+        self.info_unit_repo.index_info_units(created)
+        print(f"Transcription {entity.id} created successfully.")
+        self._report_info_units(units, created)
+        return entity, units
+
+    def set_info_units_status(self, info_unit_ids: List[int], status: str):
+        """Bulk status change, e.g. for facts verified together."""
+        updated = self.info_unit_repo.set_info_units_status(info_unit_ids, status)
+        print(f"{updated} info units set to status {status}.")
+        return updated
+
+    @staticmethod
+    def _report_info_units(units, created):
+        print(
+            f"{len(created)} info units created, "
+            f"{len(units) - len(created)} repeats linked to existing ones."
         )
-        print(f"Info unit {entity.id} created successfully.")
 
     @staticmethod
     def _online(url: str) -> bool:
@@ -89,8 +182,8 @@ class Orchestrator:
             if data:
                 # API returns either a list or a single object; normalise to list
                 payloads = data if isinstance(data, list) else [data]
-                for p in payloads:
-                    self.create_transcription(p)
+                count = self.transcription_service.upsert_transcriptions(payloads)
+                print(f"{count} remote transcriptions stored.")
         except requests.RequestException as exc:
             print(f"Error fetching transcription list: {exc}")
 
@@ -116,27 +209,20 @@ if __name__ == "__main__":
 
     # --- Create sample cases ---
     print("Creating sample cases...")
-    session = next(get_db_session())
-    case_repo = CaseRepository(session)
-
     case_data = [
         {"id": "CASE001", "status": "OPEN"},
         {"id": "CASE002", "status": "CLOSED"},
     ]
 
-    for c in case_data:
-        case = (
-            orchestrator.case_repo.db_session.query(CaseEntity)
-            .filter_by(id=c["id"])
-            .first()
-        )
-        if not case:
-            new_case = CaseEntity(
-                id=c["id"], status=c["status"], create_date=datetime.utcnow()
-            )
-            orchestrator.case_repo.db_session.add(new_case)
+    with database.write() as session:
+        for c in case_data:
+            case = session.query(CaseEntity).filter_by(id=c["id"]).first()
+            if not case:
+                new_case = CaseEntity(
+                    id=c["id"], status=c["status"], create_date=datetime.utcnow()
+                )
+                session.add(new_case)
 
-    orchestrator.case_repo.db_session.commit()
     print("Cases created.\n")
 
     # --- Create sample transcriptions ---
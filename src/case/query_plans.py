@@ -0,0 +1,155 @@
+import os
+import sys
+import tempfile
+from typing import Callable, List, Tuple
+
+from sqlalchemy import event
+
+from src.case.db import Database
+from src.case.fact_index import FactIndexRegistry
+from src.case.migrations import migrate
+from src.case.repository import (
+    CaseRepository,
+    InfoUnitRepository,
+    TranscriptionRepository,
+)
+
+
+def _repository_reads(database: Database) -> List[Tuple[str, Callable, bool]]:
+    """
+    (name, call, may scan) for every repository read. Only reads that are
+    meant to walk a whole table, in pages or entirely, may scan it.
+    """
+    transcriptions = TranscriptionRepository(database)
+    cases = CaseRepository(database)
+    info_units = InfoUnitRepository(
+        database, fact_indexes=FactIndexRegistry(lambda case_id: [])
+    )
+
+    return [
+        (
+            "get_transcription_by_id",
+            lambda: transcriptions.get_transcription_by_id(1),
+            False,
+        ),
+        (
+            "get_transcriptions_by_case_id",
+            lambda: transcriptions.get_transcriptions_by_case_id("CASE-001"),
+            False,
+        ),
+        (
+            "get_transcription_headers",
+            lambda: transcriptions.get_transcription_headers("CASE-001"),
+            False,
+        ),
+        (
+            "get_transcription_headers(before_id)",
+            lambda: transcriptions.get_transcription_headers("CASE-001", before_id=100),
+            False,
+        ),
+        # The whole table, for sync with the server
+        ("get_all_transcriptions", transcriptions.get_all_transcriptions, True),
+        ("get_case_by_id", lambda: cases.get_case_by_id("CASE-001"), False),
+        # First page of all cases: walks the primary key and stops at LIMIT
+        ("get_case_headers", cases.get_case_headers, True),
+        (
+            "get_case_headers(after_id)",
+            lambda: cases.get_case_headers(after_id="CASE-001"),
+            False,
+        ),
+        ("get_info_unit_by_id", lambda: info_units.get_info_unit_by_id(1), False),
+        (
+            "get_info_units_by_ids",
+            lambda: info_units.get_info_units_by_ids([1, 2]),
+            False,
+        ),
+        (
+            "get_info_units_by_case_id",
+            lambda: info_units.get_info_units_by_case_id("CASE-001"),
+            False,
+        ),
+        (
+            "get_info_units_by_transcription_id",
+            lambda: info_units.get_info_units_by_transcription_id(1),
+            False,
+        ),
+        (
+            "match_transcriptions",
+            lambda: transcriptions.match_transcriptions("показания свидетеля"),
+            False,
+        ),
+        (
+            "match_transcriptions(case_id)",
+            lambda: transcriptions.match_transcriptions(
+                "показания", case_id="CASE-001"
+            ),
+            False,
+        ),
+        (
+            "match_info_units",
+            lambda: info_units.match_info_units(
+                "показания", case_id="CASE-001", offset=20
+            ),
+            False,
+        ),
+    ]
+
+
+def _is_scan(detail: str) -> bool:
+    # An FTS5 table is "scanned" through its own full-text index
+    if "VIRTUAL TABLE" in detail:
+        return False
+    return detail.startswith("SCAN") or detail.startswith("USE TEMP B-TREE")
+
+
+def full_scans() -> List[Tuple[str, str, str]]:
+    """
+    Run the repository reads against a freshly migrated database and return
+    (read, statement, plan step) for every table scan, full index scan or
+    sort step outside the reads allowed to scan.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "plans.db")
+        migrate(path)
+        database = Database(f"sqlite:///{path}")
+        engine = database.read_engine
+
+        statements = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append((statement, parameters))
+
+        executed = []
+        for name, read, may_scan in _repository_reads(database):
+            del statements[:]
+            read()
+            executed.extend(
+                (name, statement, parameters)
+                for statement, parameters in statements
+                if not may_scan
+            )
+        event.remove(engine, "before_cursor_execute", capture)
+
+        scans = []
+        with engine.connect() as conn:
+            for name, statement, parameters in executed:
+                plan = conn.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                ).fetchall()
+                for row in plan:
+                    detail = row[-1]
+                    if _is_scan(detail):
+                        scans.append((name, statement, detail))
+        database.dispose()
+        return scans
+
+
+if __name__ == "__main__":
+    scans = full_scans()
+    for name, statement, detail in scans:
+        print(f"{name}: {detail}\n{statement}\n")
+    if scans:
+        sys.exit(f"{len(scans)} repository query steps scan or sort a table.")
+    print("Repository queries only scan where they are meant to.")
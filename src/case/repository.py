@@ -1,111 +1,272 @@
+import threading
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple, Union
 
-from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy import text as sql_text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, declarative_base, undefer_group
+from src.case import config
+from src.case.db import Database, database as default_database
 from src.case.enums import TranscriptionStatus
-from src.case.model import TranscriptionModel
-from src.case.entity import TranscriptionEntity, CaseEntity, InfoUnitEntity
+from src.case.model import (
+    CaseHeader,
+    InfoUnitMatch,
+    TranscriptionHeader,
+    TranscriptionMatch,
+    TranscriptionModel,
+)
+from src.case.entity import (
+    TranscriptionEntity,
+    CaseEntity,
+    InfoUnitEntity,
+    InfoUnitMentionEntity,
+)
+from src.case.dedupe import DedupeIndex, DedupeRegistry, fingerprint
+from src.case.fact_index import FactIndexRegistry, load_embedder
+from src.case.search import fts_query
 
 
 Base = declarative_base()
 
+# Every method runs in its own short session (see src/case/db.py). Methods that
+# take `session` can instead join a caller's unit of work, which commits.
+# Transcription texts are deferred: lists page through header projections, and
+# only the methods returning whole transcriptions load the texts, as sessions
+# close before callers see the entities.
+
+# Full-text search over the FTS5 tables of migration v004, best match first
+_MATCH_TRANSCRIPTIONS = """
+SELECT t.id, t.case_id, t.title,
+       snippet(transcriptions_fts, -1, '[', ']', '…', :words)
+FROM transcriptions_fts
+JOIN transcriptions AS t ON t.id = transcriptions_fts.rowid
+WHERE transcriptions_fts MATCH :query
+  AND t.is_deleted = 0
+  AND (:case_id IS NULL OR t.case_id = :case_id)
+ORDER BY transcriptions_fts.rank
+LIMIT :limit OFFSET :offset
+"""
+
+_MATCH_INFO_UNITS = """
+SELECT u.id, u.case_id, u.transcription_id, u.text,
+       snippet(info_units_fts, 0, '[', ']', '…', :words)
+FROM info_units_fts
+JOIN info_units AS u ON u.id = info_units_fts.rowid
+WHERE info_units_fts MATCH :query
+  AND (:case_id IS NULL OR u.case_id = :case_id)
+ORDER BY info_units_fts.rank
+LIMIT :limit OFFSET :offset
+"""
+
+
+def _match(database: Database, statement: str, query: str, case_id, offset, limit):
+    expression = fts_query(query)
+    if expression is None:
+        return []
+    parameters = {
+        "query": expression,
+        "case_id": case_id,
+        "words": config.SEARCH_SNIPPET_WORDS,
+        "limit": limit,
+        "offset": offset,
+    }
+    with database.read() as session:
+        return session.execute(sql_text(statement), parameters).all()
+
 
 class TranscriptionRepository:
-    def __init__(self, db_session: Session):
-        self.db_session = db_session
+    def __init__(self, database: Optional[Database] = None):
+        self.database = database or default_database
 
     def get_transcription_by_id(
-        self, transcription_id: int
+        self, transcription_id: int, session: Optional[Session] = None
     ) -> Optional[TranscriptionEntity]:
-        return (
-            self.db_session.query(TranscriptionEntity)
-            .filter(
-                TranscriptionEntity.id == transcription_id,
-                TranscriptionEntity.is_deleted == False,
+        """The transcription with its full, improved and segment texts."""
+        with self.database.read(session) as session:
+            return (
+                session.query(TranscriptionEntity)
+                .options(undefer_group("text"))
+                .filter(
+                    TranscriptionEntity.id == transcription_id,
+                    TranscriptionEntity.is_deleted == False,
+                )
+                .first()
             )
-            .first()
-        )
 
     def get_all_transcriptions(self) -> List[TranscriptionEntity]:
-        return (
-            self.db_session.query(TranscriptionEntity)
-            .filter(TranscriptionEntity.is_deleted == False)
-            .all()
-        )
+        """Every live transcription with its texts (lists use the headers)."""
+        with self.database.read() as session:
+            return (
+                session.query(TranscriptionEntity)
+                .options(undefer_group("text"))
+                .filter(TranscriptionEntity.is_deleted == False)
+                .all()
+            )
 
     def create_transcription(
-        self, transcription_model: TranscriptionModel
+        self,
+        transcription_model: TranscriptionModel,
+        session: Optional[Session] = None,
     ) -> TranscriptionEntity:
         """Takes a TranscriptionModel (business logic), converts it to TranscriptionEntity, and saves it."""
         new_transcription = TranscriptionEntity(
-            title=transcription_model.title,
-            case_id=transcription_model.case_id,
-            description=transcription_model.description,
-            mp3_url=transcription_model.mp3_url,
-            full_text=transcription_model.full_text,
-            improved_text=transcription_model.improved_text,
-            status=transcription_model.status,
-            is_deleted=False,
-            create_date=transcription_model.create_date,
-            update_date=transcription_model.update_date,
+            **self._row(transcription_model), is_deleted=False
         )
-        self.db_session.add(new_transcription)
-        self.db_session.commit()
-        self.db_session.refresh(new_transcription)
+        with self.database.write(session) as session:
+            session.add(new_transcription)
+            # Assigns the id within a caller's unit of work
+            session.flush()
         return new_transcription
 
-    def update_transcription(self, transcription_id: int, updated_fields: dict):
-        transcription_entity = (
-            self.db_session.query(TranscriptionEntity)
-            .filter(
-                TranscriptionEntity.id == transcription_id,
-                TranscriptionEntity.is_deleted == False,
+    def upsert_transcriptions(
+        self,
+        transcription_models: List[TranscriptionModel],
+        defaults: Optional[Dict] = None,
+    ) -> int:
+        """
+        Insert or update (by id) many transcriptions, one statement per set of
+        fields. An existing row only takes the fields its model sets, so a
+        partial payload keeps the local texts, and never its create_date.
+        `defaults` fill the fields a new row's model does not set.
+        """
+        groups: Dict[Tuple[str, ...], List[Dict]] = {}
+        for model in transcription_models:
+            fields = self._fields_set(model)
+            groups.setdefault(tuple(sorted(fields)), []).append(
+                {**(defaults or {}), **fields}
             )
-            .one_or_none()
-        )
-        if not transcription_entity:
-            return None
+        with self.database.write() as session:
+            for fields, rows in groups.items():
+                statement = sqlite_insert(TranscriptionEntity).values(rows)
+                updated = {
+                    field: statement.excluded[field]
+                    for field in fields
+                    if field not in ("id", "create_date")
+                }
+                # Set by the payload, or else by the column default
+                updated["update_date"] = statement.excluded.update_date
+                session.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=[TranscriptionEntity.id], set_=updated
+                    )
+                )
+        return len(transcription_models)
+
+    @staticmethod
+    def _fields_set(transcription_model: TranscriptionModel) -> Dict:
+        """The columns given when the model was built, e.g. the keys of a payload."""
+        columns = TranscriptionEntity.__table__.columns.keys()
+        return {
+            field: value
+            for field, value in vars(transcription_model).items()
+            if field in columns
+        }
+
+    @staticmethod
+    def _row(transcription_model: TranscriptionModel) -> Dict:
+        now = datetime.utcnow()
+        return {
+            "title": transcription_model.title,
+            "case_id": transcription_model.case_id,
+            "description": transcription_model.description,
+            "mp3_url": transcription_model.mp3_url,
+            "full_text": transcription_model.full_text,
+            "improved_text": transcription_model.improved_text,
+            "segments": transcription_model.segments,
+            "status": transcription_model.status,
+            "create_date": transcription_model.create_date or now,
+            "update_date": transcription_model.update_date or now,
+        }
 
-        for field, value in updated_fields.items():
-            if value is not None and hasattr(transcription_entity, field):
-                setattr(transcription_entity, field, value)
+    def update_transcription(self, transcription_id: int, updated_fields: dict):
+        with self.database.write() as session:
+            transcription_entity = self.get_transcription_by_id(
+                transcription_id, session
+            )
+            if not transcription_entity:
+                return None
 
-        transcription_entity.update_date = datetime.utcnow()
+            for field, value in updated_fields.items():
+                if value is not None and hasattr(transcription_entity, field):
+                    setattr(transcription_entity, field, value)
 
-        self.db_session.commit()
+            transcription_entity.update_date = datetime.utcnow()
         return transcription_entity
 
     def get_transcriptions_by_case_id(self, case_id: str) -> List[TranscriptionEntity]:
-        return (
-            self.db_session.query(TranscriptionEntity)
-            .filter(
+        """The case's transcriptions with their texts; see get_transcription_headers."""
+        with self.database.read() as session:
+            return (
+                session.query(TranscriptionEntity)
+                .options(undefer_group("text"))
+                .filter(
+                    TranscriptionEntity.case_id == case_id,
+                    TranscriptionEntity.is_deleted == False,
+                )
+                .all()
+            )
+
+    def get_transcription_headers(
+        self,
+        case_id: str,
+        before_id: Optional[int] = None,
+        limit: int = config.LIST_PAGE_SIZE,
+    ) -> List[TranscriptionHeader]:
+        """
+        One page of a case's transcriptions, newest first, without their texts.
+        The next page starts before the id of the last header of this one.
+        """
+        with self.database.read() as session:
+            query = session.query(
+                TranscriptionEntity.id,
+                TranscriptionEntity.title,
+                TranscriptionEntity.status,
+                TranscriptionEntity.create_date,
+            ).filter(
                 TranscriptionEntity.case_id == case_id,
                 TranscriptionEntity.is_deleted == False,
             )
-            .all()
+            if before_id is not None:
+                query = query.filter(TranscriptionEntity.id < before_id)
+            rows = query.order_by(TranscriptionEntity.id.desc()).limit(limit).all()
+        return [TranscriptionHeader(*row) for row in rows]
+
+    def match_transcriptions(
+        self,
+        query: str,
+        case_id: Optional[str] = None,
+        offset: int = 0,
+        limit: int = config.SEARCH_PAGE_SIZE,
+    ) -> List[TranscriptionMatch]:
+        """Live transcriptions whose title or texts contain every word of `query`."""
+        rows = _match(
+            self.database, _MATCH_TRANSCRIPTIONS, query, case_id, offset, limit
         )
+        return [TranscriptionMatch(*row) for row in rows]
 
     def soft_delete_transcription(self, transcription_id: int) -> bool:
         """Soft deletes the transcription by setting is_deleted = True."""
-        existing_transcription = self.get_transcription_by_id(transcription_id)
-        if not existing_transcription:
-            return False
-
-        existing_transcription.is_deleted = True
-        existing_transcription.update_date = datetime.utcnow()
+        with self.database.write() as session:
+            existing_transcription = self.get_transcription_by_id(
+                transcription_id, session
+            )
+            if not existing_transcription:
+                return False
 
-        self.db_session.commit()
+            existing_transcription.is_deleted = True
+            existing_transcription.update_date = datetime.utcnow()
         return True
 
 
 class CaseRepository:
-    def __init__(self, db_session: Session):
-        self.db_session = db_session
+    def __init__(self, database: Optional[Database] = None):
+        self.database = database or default_database
 
-    def get_case_by_id(self, case_id: str) -> Optional[CaseEntity]:
-        return (
-            self.db_session.query(CaseEntity).filter(CaseEntity.id == case_id).first()
-        )
+    def get_case_by_id(
+        self, case_id: str, session: Optional[Session] = None
+    ) -> Optional[CaseEntity]:
+        with self.database.read(session) as session:
+            return session.query(CaseEntity).filter(CaseEntity.id == case_id).first()
 
     def create_case(self, case_id: str, status: str) -> CaseEntity:
         new_case = CaseEntity(
@@ -113,123 +274,409 @@ class CaseRepository:
             status=status,
             create_date=datetime.utcnow(),
         )
-        self.db_session.add(new_case)
-        self.db_session.commit()
-        self.db_session.refresh(new_case)
+        with self.database.write() as session:
+            session.add(new_case)
         return new_case
 
     def update_case(self, case_id: str, updated_fields: dict) -> Optional[CaseEntity]:
-        case_entity = self.get_case_by_id(case_id)
-        if not case_entity:
-            return None
+        with self.database.write() as session:
+            case_entity = self.get_case_by_id(case_id, session)
+            if not case_entity:
+                return None
 
-        for field, value in updated_fields.items():
-            if value is not None and hasattr(case_entity, field):
-                setattr(case_entity, field, value)
+            for field, value in updated_fields.items():
+                if value is not None and hasattr(case_entity, field):
+                    setattr(case_entity, field, value)
 
-        case_entity.update_date = datetime.utcnow()
-
-        self.db_session.commit()
+            case_entity.update_date = datetime.utcnow()
         return case_entity
 
     def soft_delete_case(self, case_id: str) -> bool:
         """Soft deletes the case by setting is_deleted = True."""
-        existing_case = self.get_case_by_id(case_id)
-        if not existing_case:
-            return False
-
-        existing_case.status = 0
+        with self.database.write() as session:
+            existing_case = self.get_case_by_id(case_id, session)
+            if not existing_case:
+                return False
 
-        self.db_session.commit()
+            existing_case.status = 0
         return True
 
     def get_case_list(self) -> List[CaseEntity]:
-        return self.db_session.query(CaseEntity).all()
+        with self.database.read() as session:
+            return session.query(CaseEntity).all()
+
+    def get_case_headers(
+        self, after_id: Optional[str] = None, limit: int = config.LIST_PAGE_SIZE
+    ) -> List[CaseHeader]:
+        """One page of cases ordered by id, starting after `after_id`."""
+        with self.database.read() as session:
+            query = session.query(CaseEntity.id, CaseEntity.status)
+            if after_id is not None:
+                query = query.filter(CaseEntity.id > after_id)
+            rows = query.order_by(CaseEntity.id).limit(limit).all()
+        return [CaseHeader(*row) for row in rows]
+
+
+# Fields of an info unit that the search and duplicate indexes are built from
+_INDEXED_FIELDS = ("case_id", "text")
+
+_default_registries: Optional[Tuple[FactIndexRegistry, DedupeRegistry]] = None
+_default_registries_lock = threading.Lock()
+
+
+def _registries_of_default_database(
+    repository: "InfoUnitRepository",
+) -> Tuple[FactIndexRegistry, DedupeRegistry]:
+    """
+    Search and duplicate indexes of the default database, one pair per
+    process, so every repository on it (sync or async) sees the units the
+    others create.
+    """
+    global _default_registries
+    with _default_registries_lock:
+        if _default_registries is None:
+            _default_registries = (
+                FactIndexRegistry(
+                    repository.get_info_units_by_case_id, embedder=load_embedder()
+                ),
+                DedupeRegistry(repository.get_info_units_by_case_id),
+            )
+        return _default_registries
 
 
 class InfoUnitRepository:
-    def __init__(self, db_session: Session):
-        self.db_session = db_session
-
-    def get_info_unit_by_id(self, info_unit_id: int) -> Optional[InfoUnitEntity]:
-        return (
-            self.db_session.query(InfoUnitEntity)
-            .filter(InfoUnitEntity.id == info_unit_id)
-            .first()
-        )
+    def __init__(
+        self,
+        database: Optional[Database] = None,
+        fact_indexes: Optional[FactIndexRegistry] = None,
+        dedupe: Optional[DedupeRegistry] = None,
+    ):
+        self.database = database or default_database
+        if self.database is default_database and (
+            fact_indexes is None or dedupe is None
+        ):
+            default_fact_indexes, default_dedupe = _registries_of_default_database(self)
+            fact_indexes = fact_indexes or default_fact_indexes
+            dedupe = dedupe or default_dedupe
+        if fact_indexes is None:
+            fact_indexes = FactIndexRegistry(
+                self.get_info_units_by_case_id, embedder=load_embedder()
+            )
+        self.fact_indexes = fact_indexes
+        self.dedupe = dedupe or DedupeRegistry(self.get_info_units_by_case_id)
+
+    def get_info_unit_by_id(
+        self, info_unit_id: int, session: Optional[Session] = None
+    ) -> Optional[InfoUnitEntity]:
+        with self.database.read(session) as session:
+            return (
+                session.query(InfoUnitEntity)
+                .filter(InfoUnitEntity.id == info_unit_id)
+                .first()
+            )
 
     def get_info_units_by_case_id(self, case_id: str) -> List[InfoUnitEntity]:
-        return (
-            self.db_session.query(InfoUnitEntity)
-            .filter(InfoUnitEntity.case_id == case_id)
-            .all()
-        )
+        with self.database.read() as session:
+            return (
+                session.query(InfoUnitEntity)
+                .filter(InfoUnitEntity.case_id == case_id)
+                .all()
+            )
+
+    def get_info_units_by_ids(
+        self, info_unit_ids: List[int], session: Optional[Session] = None
+    ) -> List[InfoUnitEntity]:
+        """Returns the units in the order of `info_unit_ids`."""
+        if not info_unit_ids:
+            return []
+        with self.database.read(session) as session:
+            units = (
+                session.query(InfoUnitEntity)
+                .filter(InfoUnitEntity.id.in_(info_unit_ids))
+                .all()
+            )
+        by_id = {unit.id: unit for unit in units}
+        return [by_id[unit_id] for unit_id in info_unit_ids if unit_id in by_id]
+
+    def search_info_units(
+        self, case_id: str, query: str, k: int
+    ) -> List[InfoUnitEntity]:
+        return self.get_info_units_by_ids(self.fact_indexes.search(case_id, query, k))
+
+    def match_info_units(
+        self,
+        query: str,
+        case_id: Optional[str] = None,
+        offset: int = 0,
+        limit: int = config.SEARCH_PAGE_SIZE,
+    ) -> List[InfoUnitMatch]:
+        """Units whose text contains every word of `query`."""
+        rows = _match(self.database, _MATCH_INFO_UNITS, query, case_id, offset, limit)
+        return [InfoUnitMatch(*row) for row in rows]
 
     def get_info_units_by_transcription_id(
         self, transcription_id: int
     ) -> List[InfoUnitEntity]:
-        return (
-            self.db_session.query(InfoUnitEntity)
-            .filter(InfoUnitEntity.transcription_id == transcription_id)
-            .all()
+        """Units extracted from the transcription, including ones it repeated."""
+        with self.database.read() as session:
+            mentioned = session.query(InfoUnitMentionEntity.info_unit_id).filter(
+                InfoUnitMentionEntity.transcription_id == transcription_id
+            )
+            return (
+                session.query(InfoUnitEntity)
+                .filter(
+                    (InfoUnitEntity.transcription_id == transcription_id)
+                    | InfoUnitEntity.id.in_(mentioned)
+                )
+                .all()
+            )
+
+    def find_duplicate(self, case_id: str, text: str) -> Optional[InfoUnitEntity]:
+        """Stored unit of the case that states the same as `text`, if any."""
+        unit_id = self.dedupe.find(case_id, text)
+        return self.get_info_unit_by_id(unit_id) if unit_id is not None else None
+
+    def create_mention(
+        self, info_unit: InfoUnitEntity, transcription_id: int, text: str
+    ) -> InfoUnitMentionEntity:
+        """Link a repeated statement to the unit it duplicates."""
+        mention = InfoUnitMentionEntity(
+            info_unit_id=info_unit.id,
+            case_id=info_unit.case_id,
+            transcription_id=transcription_id,
+            text=text,
         )
+        with self.database.write() as session:
+            session.add(mention)
+        return mention
 
-    def create_info_unit(
+    def create_info_units(
+        self,
+        case_id: str,
+        transcription_id: int,
+        facts: List[Tuple[str, str]],
+        status: str = "0",
+        session: Optional[Session] = None,
+    ) -> Tuple[List[InfoUnitEntity], List[InfoUnitEntity]]:
+        """
+        Store many (text, language) facts of one transcription at once. Facts
+        that repeat a stored unit, or an earlier fact of the batch, are linked
+        to it as mentions. Returns (the unit of every fact, the new units).
+
+        Within a caller's `session` the caller passes the new units to
+        index_info_units once it has committed.
+        """
+        plan = self.plan_info_units(case_id, transcription_id, facts, status)
+        units, created = self.store_info_units(
+            case_id, transcription_id, facts, plan, status, session=session
+        )
+        if session is None:
+            self.index_info_units(created)
+        return units, created
+
+    def plan_info_units(
+        self,
+        case_id: str,
+        transcription_id: int,
+        facts: List[Tuple[str, str]],
+        status: str = "0",
+    ) -> List[Union[int, InfoUnitEntity]]:
+        """
+        The CPU part of create_info_units, without the database: for every fact
+        the id of the stored unit it repeats, or a new unit (the same object
+        for repeats within the batch).
+        """
+        plan: List[Union[int, InfoUnitEntity]] = []
+        new_units: List[InfoUnitEntity] = []
+        batch = DedupeIndex()
+        for text, language in facts:
+            unit_id = self.dedupe.find(case_id, text)
+            if unit_id is not None:
+                plan.append(unit_id)
+                continue
+            text_hash, simhash = fingerprint(text)
+            position = batch.find(text, text_hash, simhash)
+            if position is not None:
+                plan.append(new_units[position])
+                continue
+            unit = self.new_info_unit(
+                case_id, transcription_id, text, language, status, text_hash, simhash
+            )
+            batch.add(len(new_units), text, text_hash, simhash)
+            new_units.append(unit)
+            plan.append(unit)
+        return plan
+
+    def store_info_units(
         self,
+        case_id: str,
+        transcription_id: int,
+        facts: List[Tuple[str, str]],
+        plan: List[Union[int, InfoUnitEntity]],
+        status: str = "0",
+        session: Optional[Session] = None,
+    ) -> Tuple[List[InfoUnitEntity], List[InfoUnitEntity]]:
+        """Write a plan_info_units plan: the new units and the repeats' mentions."""
+        with self.database.write(session) as session:
+            stored = self.get_info_units_by_ids(
+                [unit for unit in plan if isinstance(unit, int)], session
+            )
+            by_id = {unit.id: unit for unit in stored}
+            units: List[InfoUnitEntity] = []
+            created: List[InfoUnitEntity] = []
+            repeats: List[Tuple[InfoUnitEntity, str]] = []
+            for (text, language), planned in zip(facts, plan):
+                if isinstance(planned, int):
+                    unit = by_id.get(planned)
+                    if unit is None:
+                        # Deleted since it was indexed
+                        unit = self.new_info_unit(
+                            case_id, transcription_id, text, language, status
+                        )
+                        created.append(unit)
+                    else:
+                        repeats.append((unit, text))
+                elif any(planned is unit for unit in created):
+                    unit = planned
+                    repeats.append((unit, text))
+                else:
+                    unit = planned
+                    created.append(unit)
+                units.append(unit)
+
+            session.add_all(created)
+            # New units need their ids before repeats can point to them
+            session.flush()
+            session.add_all(
+                InfoUnitMentionEntity(
+                    info_unit_id=unit.id,
+                    case_id=case_id,
+                    transcription_id=transcription_id,
+                    text=text,
+                )
+                for unit, text in repeats
+            )
+            session.flush()
+        return units, created
+
+    @staticmethod
+    def new_info_unit(
         case_id: str,
         transcription_id: int,
         text: str,
         language: str,
         status: str = "0",
+        text_hash: Optional[str] = None,
+        simhash: Optional[int] = None,
     ) -> InfoUnitEntity:
-        new_info_unit = InfoUnitEntity(
+        """A unit with its dedupe fingerprint, not yet stored."""
+        if text_hash is None or simhash is None:
+            text_hash, simhash = fingerprint(text)
+        return InfoUnitEntity(
             case_id=case_id,
             transcription_id=transcription_id,
             text=text,
             language=language,
             status=status,
+            text_hash=text_hash,
+            simhash=simhash,
         )
-        self.db_session.add(new_info_unit)
-        self.db_session.commit()
-        self.db_session.refresh(new_info_unit)
-        return new_info_unit
+
+    def index_info_units(self, units: List[InfoUnitEntity]):
+        """Add committed new units to the search and duplicate indexes."""
+        for unit in units:
+            self.fact_indexes.add(unit)
+            self.dedupe.add(unit)
+
+    def set_info_units_status(self, info_unit_ids: List[int], status: str) -> int:
+        """Set the status of many units (e.g. after verification) in one UPDATE."""
+        if not info_unit_ids:
+            return 0
+        with self.database.write() as session:
+            return (
+                session.query(InfoUnitEntity)
+                .filter(InfoUnitEntity.id.in_(info_unit_ids))
+                .update({InfoUnitEntity.status: status}, synchronize_session=False)
+            )
+
+    def create_info_unit(
+        self,
+        case_id: str,
+        transcription_id: int,
+        text: str,
+        language: str,
+        status: str = "0",
+    ) -> InfoUnitEntity:
+        """The new unit, or the stored unit it repeats (see create_info_units)."""
+        units, _ = self.create_info_units(
+            case_id, transcription_id, [(text, language)], status
+        )
+        return units[0]
 
     def update_info_unit(
         self, info_unit_id: int, updated_fields: dict
     ) -> Optional[InfoUnitEntity]:
-        info_unit_entity = self.get_info_unit_by_id(info_unit_id)
-        if not info_unit_entity:
-            return None
-
-        for field, value in updated_fields.items():
-            if value is not None and hasattr(info_unit_entity, field):
-                setattr(info_unit_entity, field, value)
-
-        self.db_session.commit()
+        info_unit_entity = self.update_info_unit_row(info_unit_id, updated_fields)
+        if info_unit_entity is not None and self.changes_indexes(updated_fields):
+            self.reindex_info_units([info_unit_entity])
         return info_unit_entity
 
-    def delete_info_unit(self, info_unit_id: int) -> bool:
-        info_unit_entity = self.get_info_unit_by_id(info_unit_id)
-        if not info_unit_entity:
-            return False
+    def update_info_unit_row(
+        self, info_unit_id: int, updated_fields: dict
+    ) -> Optional[InfoUnitEntity]:
+        """The database part of update_info_unit, with the unit's fingerprint."""
+        with self.database.write() as session:
+            info_unit_entity = self.get_info_unit_by_id(info_unit_id, session)
+            if not info_unit_entity:
+                return None
+
+            for field, value in updated_fields.items():
+                if value is not None and hasattr(info_unit_entity, field):
+                    setattr(info_unit_entity, field, value)
+            if updated_fields.get("text") is not None:
+                info_unit_entity.text_hash, info_unit_entity.simhash = fingerprint(
+                    info_unit_entity.text
+                )
+        return info_unit_entity
 
-        self.db_session.delete(info_unit_entity)
-        self.db_session.commit()
-        return True
+    @staticmethod
+    def changes_indexes(updated_fields: dict) -> bool:
+        """Whether an update moves the unit in the search and duplicate indexes."""
+        return any(updated_fields.get(field) is not None for field in _INDEXED_FIELDS)
 
+    def reindex_info_units(self, units: List[InfoUnitEntity]):
+        """Replace the index entries of edited units."""
+        self.unindex_info_units([unit.id for unit in units])
+        self.index_info_units(units)
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+    def unindex_info_units(self, info_unit_ids: List[int]):
+        for info_unit_id in info_unit_ids:
+            self.fact_indexes.remove(info_unit_id)
+            self.dedupe.remove(info_unit_id)
 
-if __name__ == "__main__":
+    def delete_info_unit(self, info_unit_id: int) -> bool:
+        deleted = self.delete_info_unit_rows(info_unit_id)
+        if deleted:
+            self.unindex_info_units([info_unit_id])
+        return deleted
+
+    def delete_info_unit_rows(self, info_unit_id: int) -> bool:
+        """The database part of delete_info_unit: the unit and its mentions."""
+        with self.database.write() as session:
+            info_unit_entity = self.get_info_unit_by_id(info_unit_id, session)
+            if not info_unit_entity:
+                return False
+
+            session.query(InfoUnitMentionEntity).filter(
+                InfoUnitMentionEntity.info_unit_id == info_unit_id
+            ).delete(synchronize_session=False)
+            session.delete(info_unit_entity)
+        return True
 
-    DATABASE_URL = "sqlite:///transcriptions.db"
-    engine = create_engine(DATABASE_URL)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db_session = SessionLocal()
 
-    transcription_repo = TranscriptionRepository(db_session)
-    case_repo = CaseRepository(db_session)
+if __name__ == "__main__":
+    transcription_repo = TranscriptionRepository()
+    case_repo = CaseRepository()
 
     # Test create_case
     print("Creating a new case...")
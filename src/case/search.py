@@ -0,0 +1,25 @@
+import re
+from typing import Optional
+
+from src.case.fact_index import stem
+
+_WORD = re.compile(r"\w+")
+# Shorter words (prepositions, particles) only match exactly
+_MIN_PREFIX_LENGTH = 4
+
+
+def fts_query(text: str) -> Optional[str]:
+    """
+    FTS5 MATCH expression for a free-text search: every word must occur.
+    Words match as prefixes of their stem (see fact_index.stem), so other
+    inflections of a word are found; ё is folded to е as in the index
+    (migration v004). None when `text` has no words.
+    """
+    text = text.lower().replace("ё", "е")
+    terms = []
+    for word in _WORD.findall(text):
+        if len(word) < _MIN_PREFIX_LENGTH:
+            terms.append(f'"{word}"')
+        else:
+            terms.append(f'"{stem(word)}"*')
+    return " ".join(terms) or None
@@ -1,6 +1,8 @@
 import os
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
 
 from src.case.enums import TranscriptionStatus
 from src.case.model import TranscriptionModel
@@ -18,17 +20,25 @@ class TranscriptionService:
         self.repo = transcription_repository
 
     # ---------- Creation -------------------------------------------------- #
-    def create_new_transcription(self, raw: Dict) -> TranscriptionEntity:
+    def create_new_transcription(
+        self, raw: Dict, session: Optional[Session] = None
+    ) -> TranscriptionEntity:
         """
         • Accept **raw** data exactly as it comes from the API
         • Parse / normalise it here
         • Persist via the repository
         """
-        parsed = self._parse_dates(raw)
-        model = TranscriptionModel(
-            **parsed, status=TranscriptionStatus.TRANSCRIPTION.value
+        return self.repo.create_transcription(self._to_model(raw), session=session)
+
+    def upsert_transcriptions(self, raws: List[Dict]) -> int:
+        """
+        Insert or update (by id) a batch of API payloads. Stored transcriptions
+        only take the fields their payload has.
+        """
+        return self.repo.upsert_transcriptions(
+            [TranscriptionModel(**self._parse_dates(raw)) for raw in raws],
+            defaults={"status": TranscriptionStatus.TRANSCRIPTION.value},
         )
-        return self.repo.create_transcription(model)
 
     # ---------- Updates --------------------------------------------------- #
     def partial_update(self, transcription_id: int, fields: Dict):
@@ -41,7 +51,23 @@ class TranscriptionService:
     def get_transcriptions_by_case_id(self, case_id: str):
         return self.repo.get_transcriptions_by_case_id(case_id)
 
+    def get_transcription(self, transcription_id: int):
+        return self.repo.get_transcription_by_id(transcription_id)
+
+    def get_transcription_headers(self, case_id: str, before_id: Optional[int] = None):
+        return self.repo.get_transcription_headers(case_id, before_id=before_id)
+
+    def match_transcriptions(
+        self, query: str, case_id: Optional[str] = None, offset: int = 0
+    ):
+        return self.repo.match_transcriptions(query, case_id, offset=offset)
+
     # ---------- Helpers --------------------------------------------------- #
+    def _to_model(self, raw: Dict) -> TranscriptionModel:
+        parsed = self._parse_dates(raw)
+        parsed.setdefault("status", TranscriptionStatus.TRANSCRIPTION.value)
+        return TranscriptionModel(**parsed)
+
     @staticmethod
     def _parse_dates(payload: Dict) -> Dict:
         """Convert ISO strings to `datetime` objects (in-place safe)."""
@@ -1,6 +1,14 @@
-from enum import Enum
+from enum import Enum, IntEnum
 
 
 class Language(Enum):
     RUSSIAN = "rus"
     KAZAKH = "kaz"
+
+
+class Priority(IntEnum):
+    """Order in which queued LLM jobs run; lower runs first."""
+
+    LIVE = 0  # while recording
+    NORMAL = 1  # the user is waiting for it
+    BACKGROUND = 2  # warm-up and other work nobody waits for
@@ -0,0 +1,66 @@
+from pathlib import Path
+from typing import Dict, Optional
+
+import llama_cpp
+from llama_cpp import Llama
+
+from src.llm import config
+
+
+class LanguageAdapters:
+    """
+    Per-language LoRA adapters over one mmapped base model.
+
+    All adapters are loaded next to the base weights once (they are small) and
+    switched on the context with llama_set_adapter_lora, so changing language
+    costs a KV-cache reset instead of loading another model.
+    """
+
+    def __init__(
+        self,
+        llm: Llama,
+        paths: Dict[str, Path] = config.LORA_ADAPTERS,
+        scale: float = config.LORA_SCALE,
+    ):
+        self.llm = llm
+        self.scale = scale
+        self.paths = {language: Path(path) for language, path in paths.items()}
+        self.active: Optional[str] = None
+        self._adapters = {}
+        for language, path in self.paths.items():
+            # Freed by llama.cpp together with the model
+            adapter = llama_cpp.llama_adapter_lora_init(
+                llm._model.model, str(path).encode("utf-8")
+            )
+            if adapter is None:
+                raise RuntimeError(f"Failed to load LoRA adapter: {path}")
+            self._adapters[language] = adapter
+
+    def activate(self, language: Optional[str]) -> bool:
+        """
+        Switch to the adapter of `language`; languages without one (and None)
+        use the base model. Returns True if the active adapter changed.
+        """
+        if language not in self._adapters:
+            language = None
+        if language == self.active:
+            return False
+
+        llama_cpp.llama_clear_adapter_lora(self.llm._ctx.ctx)
+        if language is not None:
+            if llama_cpp.llama_set_adapter_lora(
+                self.llm._ctx.ctx, self._adapters[language], self.scale
+            ):
+                self.active = None
+                raise RuntimeError(f"Failed to set LoRA adapter for {language}")
+        self.active = language
+        # The KV cache was computed with the previous weights
+        self.llm.reset()
+        return True
+
+    def fingerprint(self) -> Optional[str]:
+        """Identifies the active adapter in result-cache keys."""
+        if self.active is None:
+            return None
+        path = self.paths[self.active]
+        return f"{path.name}:{path.stat().st_size}:{path.stat().st_mtime_ns}"
@@ -0,0 +1,96 @@
+from itertools import groupby
+from typing import List, NamedTuple
+
+from src.llm import config
+
+
+class AnalysisUnit(NamedTuple):
+    """The fields of an info unit the analysis needs; sent to the worker process."""
+
+    id: int
+    transcription_id: int
+    text: str
+
+
+class CaseAnalyzer:
+    """
+    Map-reduce contradiction analysis over all facts of a case.
+
+    Map: the facts of every transcription are condensed into a partial analysis
+    (key statements + contradictions). Reduce: partials are packed left to right
+    into groups that fit the context and merged, level by level, until one
+    remains; the final pass runs the regular analyze prompt over it.
+
+    Every call goes through LLM.local_llm and its persistent result cache, and
+    groups are packed in transcription order, so adding a transcription only
+    recomputes its own leaf and the rightmost branch of the tree.
+    """
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    def analyze(self, info_units, on_token=None, language=None) -> str:
+        leaves = [
+            self._partial("\n".join(unit.text for unit in units))
+            for _, units in groupby(
+                sorted(info_units, key=lambda unit: (unit.transcription_id, unit.id)),
+                key=lambda unit: unit.transcription_id,
+            )
+        ]
+        root = self._reduce(leaves)
+        return self.llm.analyze(root, on_token=on_token, language=language)
+
+    def _partial(self, facts: str) -> str:
+        """Condense one transcription's facts, splitting them if they don't fit."""
+        prompt_path = config.ANALYZE_PARTIAL_PROMPT_PATH
+        budget = self.llm.input_budget("analyze", prompt_path)
+        partials = [
+            self._run(prompt_path, chunk)
+            for chunk in self.llm.chunker.chunk(facts, budget)
+        ]
+        return self._reduce(partials)
+
+    def _reduce(self, partials: List[str]) -> str:
+        prompt_path = config.ANALYZE_MERGE_PROMPT_PATH
+        budget = self.llm.input_budget("analyze", prompt_path)
+        while len(partials) > 1:
+            partials = [
+                (
+                    self._run(prompt_path, "\n\n".join(group))
+                    if len(group) > 1
+                    else group[0]
+                )
+                for group in self._pack(partials, budget)
+            ]
+        return partials[0] if partials else ""
+
+    def _pack(self, partials: List[str], budget: int) -> List[List[str]]:
+        """Greedy, order-preserving grouping of partials under the token budget."""
+        groups: List[List[str]] = []
+        group_tokens = 0
+        for partial in partials:
+            tokens = self.llm.chunker.count_tokens(partial)
+            if (
+                groups
+                and len(groups[-1]) < config.ANALYSIS_MAX_FAN_IN
+                and group_tokens + tokens <= budget
+            ):
+                groups[-1].append(partial)
+                group_tokens += tokens
+            else:
+                groups.append([partial])
+                group_tokens = tokens
+
+        # Guarantee progress when every partial fills a whole group on its own
+        if len(groups) == len(partials) and len(partials) > 1:
+            groups = [partials[i : i + 2] for i in range(0, len(partials), 2)]
+        return groups
+
+    def _run(self, prompt_path: str, text: str) -> str:
+        system_prompt = self.llm.system_prompt(prompt_path)
+        max_tokens = self.llm.planner.max_tokens(
+            "analyze",
+            len(self.llm.prompts.prefix_tokens(system_prompt)),
+            self.llm.chunker.count_tokens(text),
+        )
+        return self.llm.local_llm(system_prompt, text, max_tokens=max_tokens)
@@ -0,0 +1,45 @@
+import math
+
+from src.llm import config
+
+# Chat-template tokens around the user turn that are not part of the system prefix
+_TEMPLATE_OVERHEAD_TOKENS = 16
+
+
+class BudgetPlanner:
+    """
+    Splits the context window between system prompt, input chunk and output.
+
+    For a task with output ratio r, a chunk of n tokens needs roughly n * r
+    tokens of output, so the largest safe chunk is
+    (n_ctx - prompt - margin) / (1 + r).
+    """
+
+    def __init__(
+        self,
+        n_ctx: int,
+        output_ratio: dict = config.OUTPUT_RATIO,
+        safety_tokens: int = config.CONTEXT_SAFETY_TOKENS,
+        min_output_tokens: int = config.MIN_OUTPUT_TOKENS,
+    ):
+        self.n_ctx = n_ctx
+        self.output_ratio = output_ratio
+        self.safety_tokens = safety_tokens
+        self.min_output_tokens = min_output_tokens
+
+    def input_budget(self, task: str, prompt_tokens: int) -> int:
+        """Largest input chunk (in tokens) that leaves room for its output."""
+        free = self._free_tokens(prompt_tokens) - self.min_output_tokens
+        return max(int(free / (1 + self.output_ratio[task])), 1)
+
+    def max_tokens(self, task: str, prompt_tokens: int, input_tokens: int) -> int:
+        """Output cap proportional to the input, never beyond the context window."""
+        wanted = math.ceil(input_tokens * self.output_ratio[task])
+        wanted += self.min_output_tokens
+        available = self._free_tokens(prompt_tokens) - input_tokens
+        return max(min(wanted, available), 1)
+
+    def _free_tokens(self, prompt_tokens: int) -> int:
+        return (
+            self.n_ctx - prompt_tokens - _TEMPLATE_OVERHEAD_TOKENS - self.safety_tokens
+        )
@@ -0,0 +1,55 @@
+import threading
+from contextlib import contextmanager
+from typing import Callable, List
+
+from src.llm.exceptions.llm_exceptions import JobInterrupted
+
+
+class CancellationToken:
+    """
+    Shared flag for all LLM work of one session. Cancelling it stops running
+    generations at their next token and drops queued ones; calls made with the
+    token then return whatever was completed before the cancel.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def register(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run `callback` on cancel (at once if already cancelled); returns an unregister function."""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+@contextmanager
+def keep_partial(get_partial: Callable[[], object]):
+    """Attach the work completed so far to a cancellation/timeout raised inside."""
+    try:
+        yield
+    except JobInterrupted as e:
+        if e.partial is not None:
+            raise
+        raise type(e)(e.args[0], get_partial()) from None
@@ -0,0 +1,113 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import List
+
+from llama_cpp import Llama
+
+# Lines written by Transcriber.record_and_transcribe: "[HH:MM:SS] Speaker N: text"
+SPEAKER_LINE = re.compile(r"^\[\d{2}:\d{2}:\d{2}\] Speaker \d+:")
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+class TranscriptChunker:
+    """
+    Splits a transcript into token-bounded chunks on speaker-line boundaries.
+    Tokens are counted with the GGUF model's own tokenizer and cached per line,
+    so the same text is never tokenized twice. The cache is shared by the
+    recorder, the enhancer worker and post-analysis, hence the lock.
+    """
+
+    def __init__(self, llm: Llama, cache_size: int = 4096):
+        self.llm = llm
+        self.cache_size = cache_size
+        self._token_cache: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def tokenize(self, text: str) -> List[int]:
+        with self._cache_lock:
+            tokens = self._token_cache.get(text)
+            if tokens is not None:
+                self._token_cache.move_to_end(text)
+                return tokens
+
+        tokens = self.llm.tokenize(text.encode("utf-8"), add_bos=False)
+        with self._cache_lock:
+            self._token_cache[text] = tokens
+            self._token_cache.move_to_end(text)
+            if len(self._token_cache) > self.cache_size:
+                self._token_cache.popitem(last=False)
+        return tokens
+
+    def count_tokens(self, text: str) -> int:
+        return sum(len(self.tokenize(turn)) + 1 for turn in self.split_turns(text))
+
+    def chunk(self, text: str, chunk_size: int) -> List[str]:
+        """Pack whole speaker turns into chunks of at most `chunk_size` tokens."""
+        chunks = []
+        current: List[str] = []
+        current_len = 0
+
+        for turn in self.split_turns(text):
+            turn_len = len(self.tokenize(turn)) + 1  # + newline
+            if turn_len > chunk_size:
+                if current:
+                    chunks.append("\n".join(current))
+                    current, current_len = [], 0
+                chunks.extend(self._split_long_turn(turn, chunk_size))
+                continue
+
+            if current and current_len + turn_len > chunk_size:
+                chunks.append("\n".join(current))
+                current, current_len = [], 0
+            current.append(turn)
+            current_len += turn_len
+
+        if current:
+            chunks.append("\n".join(current))
+        return chunks
+
+    @staticmethod
+    def split_turns(text: str) -> List[str]:
+        """
+        Group lines into speaker turns; unlabeled lines belong to the previous
+        turn. Text without any speaker labels (e.g. fact lists) is split per line.
+        """
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        labeled = any(SPEAKER_LINE.match(line) for line in lines)
+        turns: List[str] = []
+        for line in lines:
+            if labeled and turns and not SPEAKER_LINE.match(line):
+                turns[-1] = f"{turns[-1]} {line}"
+            else:
+                turns.append(line)
+        return turns
+
+    def _split_long_turn(self, turn: str, chunk_size: int) -> List[str]:
+        """Split an oversized turn on sentences (then words), repeating its label."""
+        match = SPEAKER_LINE.match(turn)
+        label = match.group(0) if match else ""
+        body = turn[len(label) :].strip()
+        budget = max(chunk_size - len(self.tokenize(label)) - 1, 1)
+
+        pieces: List[str] = []
+        for sentence in _SENTENCE_END.split(body):
+            if len(self.tokenize(sentence)) <= budget:
+                pieces.append(sentence)
+            else:
+                pieces.extend(sentence.split())
+
+        parts = []
+        current: List[str] = []
+        current_len = 0
+        for piece in pieces:
+            piece_len = len(self.tokenize(piece)) + 1
+            if current and current_len + piece_len > budget:
+                parts.append(" ".join(current))
+                current, current_len = [], 0
+            current.append(piece)
+            current_len += piece_len
+        if current:
+            parts.append(" ".join(current))
+
+        return [f"{label} {part}".strip() for part in parts]
@@ -0,0 +1,84 @@
+from typing import Dict, List, NamedTuple
+
+from src.llm import config
+
+
+class Span(NamedTuple):
+    segment: int  # index of the segment
+    start: int  # first word
+    end: int  # past the last word
+    text: str
+
+
+def segment_line(segment: Dict) -> str:
+    """Transcript line of a segment, as Transcriber writes it."""
+    return f"{segment['timestamp']} {segment['speaker']}: {segment['text']}"
+
+
+def low_confidence_spans(
+    segments: List[Dict],
+    threshold: float = config.ASR_CONFIDENCE_THRESHOLD,
+    context: int = config.CONFIDENCE_CONTEXT_WORDS,
+) -> List[Span]:
+    """
+    Word ranges around every word the ASR scored below `threshold`, widened by
+    `context` words on each side and merged where they overlap. A segment
+    whose words carry no confidences is one span as a whole.
+
+    Segments are dicts with "timestamp", "speaker", "text" and "words", a list
+    of [word, confidence, start, end] aligned with the words of "text".
+    """
+    spans = []
+    for index, segment in enumerate(segments):
+        tokens = segment["text"].split()
+        words = segment.get("words")
+        if not words or len(words) != len(tokens):
+            if tokens:
+                spans.append(Span(index, 0, len(tokens), segment["text"]))
+            continue
+
+        start = end = None
+        for i, word in enumerate(words):
+            if word[1] is not None and word[1] >= threshold:
+                continue
+            low_start, low_end = max(0, i - context), min(len(tokens), i + 1 + context)
+            if end is not None and low_start <= end:
+                end = low_end
+                continue
+            if end is not None:
+                spans.append(Span(index, start, end, " ".join(tokens[start:end])))
+            start, end = low_start, low_end
+        if end is not None:
+            spans.append(Span(index, start, end, " ".join(tokens[start:end])))
+    return spans
+
+
+def splice_spans(
+    segments: List[Dict], spans: List[Span], corrections: Dict[int, str]
+) -> str:
+    """
+    Rebuild the transcript with the corrected text of each span (keyed by its
+    index in `spans`); spans without a correction keep the recognized words.
+    """
+    by_segment: Dict[int, List[int]] = {}
+    for i, span in enumerate(spans):
+        by_segment.setdefault(span.segment, []).append(i)
+
+    lines = []
+    for index, segment in enumerate(segments):
+        if index not in by_segment:
+            lines.append(segment_line(segment))
+            continue
+
+        tokens = segment["text"].split()
+        parts = []
+        position = 0
+        for i in by_segment[index]:
+            span = spans[i]
+            parts.extend(tokens[position : span.start])
+            parts.append(corrections.get(i, span.text))
+            position = span.end
+        parts.extend(tokens[position:])
+        text = " ".join(part for part in parts if part)
+        lines.append(segment_line({**segment, "text": text}))
+    return "\n".join(lines)
@@ -1,12 +1,62 @@
 import os
 
+from src.enums import Language
+
 MAX_TOKENS = 2048
-MAX_CONTEXT = 4096
+# The context is the largest that fits LLM_MEMORY_BUDGET_BYTES within these
+# bounds, unless DOPROS_LLM_CONTEXT fixes it (see src/llm/memory.py). A budget
+# too small for MIN_CONTEXT gets MIN_CONTEXT anyway, with a warning.
+MIN_CONTEXT = 4096
+MAX_CONTEXT = 16384
+CONTEXT_STEP = 512
+N_BATCH = 512
+N_UBATCH = 256
+# Scratch buffers of llama.cpp's compute graph, not counting the KV cache
+COMPUTE_BUFFER_BYTES = 384 << 20
 NUM_THREADS = os.cpu_count() // 2
 TEMPERATURE = 0.4
 TOP_K = 50
 TOP_P = 0.95
 REPEAT_PENALTY = 1.2
+CHAT_FORMAT = "llama-3"
+
+IMPROVE_PROMPT_PATH = "src/llm/prompts/improve_transcription_prompt_uni.txt"
+IMPROVE_EDITS_PROMPT_PATH = "src/llm/prompts/improve_edits_prompt_uni.txt"
+IMPROVE_SPANS_PROMPT_PATH = "src/llm/prompts/improve_spans_prompt_uni.txt"
+SUMMARIZE_PROMPT_PATH = "src/llm/prompts/summarize_prompt_uni.txt"
+ANALYZE_PROMPT_PATH = "src/llm/prompts/analyze_prompt_uni.txt"
+ANALYZE_PARTIAL_PROMPT_PATH = "src/llm/prompts/analyze_partial_prompt_uni.txt"
+ANALYZE_MERGE_PROMPT_PATH = "src/llm/prompts/analyze_merge_prompt_uni.txt"
+# Most partial analyses merged by one reduce call (see src/llm/analysis.py)
+ANALYSIS_MAX_FAN_IN = 4
+
+# With ASR word confidences, only words below the threshold (plus this many
+# words of context on each side) are sent for correction (src/llm/confidence.py)
+ASR_CONFIDENCE_THRESHOLD = 0.85
+CONFIDENCE_CONTEXT_WORDS = 3
+
+# Expected output length relative to the input chunk, per task; sizes both the
+# chunks and their max_tokens (see src/llm/budget.py)
+OUTPUT_RATIO = {
+    "improve": 1.2,
+    "edit": 0.25,
+    "summarize": 0.5,
+    "analyze": 0.5,
+}
+MIN_OUTPUT_TOKENS = 64
+CONTEXT_SAFETY_TOKENS = 64
+
+# Prompt-lookup speculative decoding for transcript correction, whose output
+# mostly copies its input (see src/llm/speculative.py)
+SPECULATIVE_MAX_NGRAM = 3
+SPECULATIVE_NUM_PRED_TOKENS = 10
+
+# Weight of the per-language LoRA adapters (see src/llm/adapters.py)
+LORA_SCALE = 1.0
+
+# KV states of evaluated system prompts, see src/llm/prompt_registry.py
+PROMPT_CACHE_RAM_BYTES = 1 << 30
+PROMPT_CACHE_DISK_BYTES = 4 << 30
 
 
 ###LOAD ENV FROM .ENV FILE
@@ -15,8 +65,37 @@ from dotenv import load_dotenv, find_dotenv
 
 load_dotenv(find_dotenv())
 
-HF_MODEL_NAME = os.getenv("DOPROS_HF_MODEL_NAME")
 PATH_TO_LOCAL_LLM = Path(os.getenv("DOPROS_PATH_TO_LOCAL_LLM", ""))
+# Optional: persist system-prompt KV states between runs
+PROMPT_CACHE_DIR = (
+    Path(os.getenv("DOPROS_PROMPT_CACHE_DIR"))
+    if os.getenv("DOPROS_PROMPT_CACHE_DIR")
+    else None
+)
+# Optional LoRA adapter per session language, e.g. DOPROS_LORA_ADAPTER_KAZ
+LORA_ADAPTERS = {
+    language.value: Path(os.getenv(f"DOPROS_LORA_ADAPTER_{language.value.upper()}"))
+    for language in Language
+    if os.getenv(f"DOPROS_LORA_ADAPTER_{language.value.upper()}")
+}
+# Completed generations, keyed by model/prompt/params/input (src/llm/result_cache.py)
+RESULT_CACHE_DIR = Path(os.getenv("DOPROS_LLM_RESULT_CACHE_DIR", ".cache/llm_results"))
+RESULT_CACHE_BYTES = 512 << 20
+# "rewrite": the model regenerates the corrected text; "edits": it only lists
+# replacements against numbered segments (see src/llm/edits.py)
+IMPROVE_MODE = os.getenv("DOPROS_IMPROVE_MODE", "rewrite")
+# Rewrite the transcript with the LLM while recording; by default the live
+# transcript is only punctuated and the rewrite runs when the user asks for it
+LIVE_IMPROVE = os.getenv("DOPROS_LIVE_IMPROVE", "0") == "1"
+# KV cache type: "f16", "q8_0" or "q4_0"; V is only quantized with flash attention
+KV_CACHE_TYPE = os.getenv("DOPROS_KV_CACHE_TYPE", "q8_0")
+FLASH_ATTN = os.getenv("DOPROS_FLASH_ATTN", "1") == "1"
+# KV cache and compute buffers of the LLM worker must fit in this. The weights
+# are mmapped from the GGUF file and paged in by the OS, so they do not count.
+LLM_MEMORY_BUDGET_BYTES = int(os.getenv("DOPROS_LLM_MEMORY_MB", "1536")) << 20
+CONTEXT_SIZE = int(os.getenv("DOPROS_LLM_CONTEXT", "0"))  # 0: choose automatically
+# Needs logits for every position, i.e. n_ctx * n_vocab floats of extra RAM
+SPECULATIVE_DECODING = os.getenv("DOPROS_SPECULATIVE_DECODING", "0") == "1"
 
 if not PATH_TO_LOCAL_LLM.exists():
     raise FileNotFoundError(f"Model file not found: {PATH_TO_LOCAL_LLM}")
@@ -0,0 +1,83 @@
+import json
+import re
+from typing import Dict, List, Tuple
+
+from src.llm.chunker import SPEAKER_LINE, TranscriptChunker
+
+# One edit per line: segment number, exact fragment to replace, replacement
+EDIT_GRAMMAR = r"""
+root ::= edit*
+edit ::= "{\"s\":" num ",\"from\":\"" text "\",\"to\":\"" text? "\"}\n"
+num ::= [0-9]+
+text ::= char+
+char ::= [^"\\\n] | "\\" ["\\/bnrt]
+"""
+
+_NUMBERED = re.compile(r"^\[(\d+)\] ")
+
+Edits = Dict[int, List[Tuple[str, str]]]
+
+
+def number_segments(text: str) -> str:
+    """Prefix every speaker turn with "[N] " so edits can refer to it."""
+    turns = TranscriptChunker.split_turns(text)
+    return "\n".join(f"[{i}] {turn}" for i, turn in enumerate(turns, start=1))
+
+
+def parse_edits(output: str) -> Edits:
+    """Group the generated edit lines by segment; malformed lines are skipped."""
+    edits: Edits = {}
+    for line in output.splitlines():
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(data, dict):
+            continue
+        segment, old, new = data.get("s"), data.get("from"), data.get("to", "")
+        if not isinstance(segment, int) or not isinstance(old, str) or not old:
+            continue
+        if not isinstance(new, str):
+            continue
+        edits.setdefault(segment, []).append((old, new))
+    return edits
+
+
+def apply_edits(numbered_chunk: str, edits: Edits) -> str:
+    """
+    Apply edits to a chunk of numbered segments and drop the numbers. An edit
+    whose fragment is not found in its segment is ignored, and speaker labels
+    are never edited. Lines without a number (the tail of a turn that did not
+    fit one chunk) are kept as they are.
+    """
+    lines = []
+    for line in numbered_chunk.splitlines():
+        match = _NUMBERED.match(line)
+        if not match:
+            lines.append(line)
+            continue
+
+        turn = line[match.end() :]
+        label = SPEAKER_LINE.match(turn)
+        label = label.group(0) if label else ""
+        body = apply_segment_edits(turn[len(label) :], edits.get(int(match.group(1))))
+        lines.append(f"{label}{body}")
+    return "\n".join(lines)
+
+
+def apply_segment_edits(text: str, segment_edits) -> str:
+    """Apply one segment's (from, to) edits; fragments not found are ignored."""
+    for old, new in segment_edits or []:
+        if old in text:
+            text = text.replace(old, new, 1)
+    return text
+
+
+def numbered_lines(chunk: str) -> Dict[int, str]:
+    """Segment number -> text of every "[N] " line in a numbered chunk."""
+    lines = {}
+    for line in chunk.splitlines():
+        match = _NUMBERED.match(line)
+        if match:
+            lines[int(match.group(1))] = line[match.end() :]
+    return lines
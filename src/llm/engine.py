@@ -0,0 +1,563 @@
+import os
+from llama_cpp import Llama, LlamaGrammar
+from src.llm import config
+from src.llm.adapters import LanguageAdapters
+from src.llm.analysis import CaseAnalyzer
+from src.llm.budget import BudgetPlanner
+from src.llm.cancellation import keep_partial
+from src.llm.chunker import TranscriptChunker
+from src.llm.confidence import low_confidence_spans, segment_line, splice_spans
+from src.llm.edits import (
+    EDIT_GRAMMAR,
+    apply_edits,
+    apply_segment_edits,
+    number_segments,
+    numbered_lines,
+    parse_edits,
+)
+from src.llm.facts import FACT_GRAMMAR, FactStreamParser
+from src.llm.memory import KV_CACHE_TYPES, Vocabulary, choose_context, kv_cache_types
+from src.llm.prompt_registry import PromptRegistry, localized_path
+from src.llm.result_cache import ResultCache
+from src.llm.speculative import PromptLookupDraft
+
+
+def _spells_out(segments, transcription) -> bool:
+    """True if the segments' lines are exactly the transcript's text."""
+    lines = "\n".join(segment_line(segment) for segment in segments)
+    return lines.strip() == (transcription or "").strip()
+
+
+class LLMEngine:
+    """
+    Owns the Llama model and runs all generation. Lives in the inference worker
+    process (src/llm/service.py); the rest of the app talks to it through LLM.
+    """
+
+    def __init__(
+        self,
+        model_path=str(
+            config.PATH_TO_LOCAL_LLM
+        ),  # str conversion because An error occurred: 'WindowsPath' object has no attribute 'encode'
+        n_ctx: int = config.CONTEXT_SIZE,
+        speculative: bool = config.SPECULATIVE_DECODING,
+    ):
+        if not os.path.isfile(model_path):
+            raise FileNotFoundError(f"GGUF model not found: {model_path}")
+        if not n_ctx:
+            n_ctx = choose_context(Vocabulary(model_path), logits_all=speculative)
+        type_k, type_v = kv_cache_types()
+        self.llm = Llama(
+            model_path=model_path,
+            n_ctx=n_ctx,
+            n_threads=config.NUM_THREADS,
+            n_batch=config.N_BATCH,
+            n_ubatch=config.N_UBATCH,
+            flash_attn=config.FLASH_ATTN,
+            type_k=KV_CACHE_TYPES[type_k][0],
+            type_v=KV_CACHE_TYPES[type_v][0],
+            use_mlock=False,
+            use_mmap=True,
+            chat_format=config.CHAT_FORMAT,
+            # verifying a draft samples at every drafted position
+            logits_all=speculative,
+            verbose=False,
+        )
+        # Enabled per call, only for tasks whose output copies the input
+        self.draft = PromptLookupDraft() if speculative else None
+        self.chunker = TranscriptChunker(self.llm)
+        self.prompts = PromptRegistry(self.llm)
+        self.adapters = LanguageAdapters(self.llm)
+        # Session language: selects the LoRA adapter and the prompt files
+        self.language = None
+        self.planner = BudgetPlanner(self.llm.n_ctx())
+        self.results = ResultCache(model_path)
+        self.case_analyzer = CaseAnalyzer(self)
+        self._grammars = {}
+        # Set by the worker while a job runs; raises to abort the generation
+        self.interrupt = None
+
+    def local_llm(
+        self,
+        system_prompt,
+        user_prompt,
+        max_tokens=config.MAX_TOKENS,
+        on_token=None,
+        grammar=None,
+        speculative=False,
+    ):
+        """
+        `grammar` is optional GBNF source constraining the output; `speculative`
+        drafts tokens from the input (only worth it when output mostly copies it).
+        """
+        if self.interrupt is not None:
+            self.interrupt()
+        key = self.results.key(
+            system_prompt,
+            user_prompt,
+            {
+                **self._sampling_params(max_tokens),
+                "grammar": grammar,
+                "adapter": self.adapters.fingerprint(),
+            },
+        )
+        cached = self.results.get(key)
+        if cached is not None:
+            if on_token:
+                on_token(cached)
+            return cached
+
+        pieces = []
+        for piece in self.stream_llm(
+            system_prompt, user_prompt, max_tokens, grammar, speculative
+        ):
+            pieces.append(piece)
+            if on_token:
+                on_token(piece)
+        result = "".join(pieces).strip()
+        self.results.set(key, result)
+        return result
+
+    def stream_llm(
+        self,
+        system_prompt,
+        user_prompt,
+        max_tokens=config.MAX_TOKENS,
+        grammar=None,
+        speculative=False,
+    ):
+        """Yield the completion text piece by piece as llama.cpp generates it."""
+        self.prompts.restore(system_prompt)
+        if speculative and self.draft is not None:
+            self.draft.begin()
+            self.llm.draft_model = self.draft
+        stream = self.llm.create_chat_completion(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            stream=True,
+            grammar=self._grammar(grammar),
+            **self._sampling_params(max_tokens),
+        )
+        try:
+            for chunk in stream:
+                # chat completion takes no stopping criteria; raising here
+                # closes the stream, which stops llama.cpp between tokens
+                if self.interrupt is not None:
+                    self.interrupt()
+                piece = chunk["choices"][0]["delta"].get("content")
+                if piece:
+                    yield piece
+        finally:
+            stream.close()
+            self.llm.draft_model = None
+
+    def cache_stats(self):
+        """Hit/miss counters and size of the persistent result cache."""
+        return self.results.stats()
+
+    def warm(self, *prompt_paths, language=None):
+        """Evaluate the system prompts ahead of their first use."""
+        self.use_language(language)
+        for prompt_path in prompt_paths:
+            self.prompts.restore(self.system_prompt(prompt_path))
+
+    def use_language(self, language):
+        """Switch adapter and prompts to `language` (None: base model, universal prompts)."""
+        self.language = language
+        if self.adapters.activate(language):
+            self.prompts.variant = self.adapters.active or ""
+
+    def system_prompt(self, prompt_path):
+        """Text of the prompt, in its session-language variant when there is one."""
+        return self.prompts.get(localized_path(prompt_path, self.language))
+
+    def speculation_stats(self):
+        """Drafted vs. accepted tokens of prompt-lookup decoding so far."""
+        if self.draft is None:
+            return {"steps": 0, "proposed": 0, "accepted": 0, "acceptance_rate": 0.0}
+        return self.draft.stats()
+
+    def improve_transcription(
+        self,
+        transcription,
+        prompt_path=None,
+        on_token=None,
+        mode=config.IMPROVE_MODE,
+        language=None,
+        segments=None,
+    ):
+        """
+        Correct a transcript. Given its `segments` with ASR word confidences,
+        only the low-confidence spans are corrected (see src/llm/confidence.py),
+        provided the segments still spell out `transcription`; text that was
+        edited since is corrected as a whole.
+        """
+        self.use_language(language)
+        if segments and _spells_out(segments, transcription):
+            return self._improve_low_confidence(
+                segments, prompt_path or config.IMPROVE_SPANS_PROMPT_PATH, on_token
+            )
+        transcription = self._smart_text_detect(transcription)
+        if mode == "edits":
+            return self._improve_with_edits(
+                transcription, prompt_path or config.IMPROVE_EDITS_PROMPT_PATH, on_token
+            )
+        system_prompt = self.system_prompt(prompt_path or config.IMPROVE_PROMPT_PATH)
+
+        improved_chunks = []
+        with keep_partial(lambda: "\n".join(improved_chunks)):
+            for chunk, max_tokens in self._plan_chunks(
+                transcription, system_prompt, "improve"
+            ):
+                if improved_chunks and on_token:
+                    on_token("\n")
+                result = self.local_llm(
+                    system_prompt,
+                    chunk,
+                    max_tokens=max_tokens,
+                    on_token=on_token,
+                    speculative=True,
+                )
+                improved_chunks.append(result)
+
+        return "\n".join(improved_chunks)
+
+    def _improve_with_edits(self, transcription, prompt_path, on_token=None):
+        """
+        Correct by generating only a list of edits against numbered segments and
+        applying them locally; output cost scales with the number of errors.
+        """
+        system_prompt = self.system_prompt(prompt_path)
+
+        improved_chunks = []
+        with keep_partial(lambda: "\n".join(improved_chunks)):
+            for chunk, max_tokens in self._plan_chunks(
+                number_segments(transcription), system_prompt, "edit"
+            ):
+                output = self.local_llm(
+                    system_prompt, chunk, max_tokens=max_tokens, grammar=EDIT_GRAMMAR
+                )
+                result = apply_edits(chunk, parse_edits(output))
+                if on_token:
+                    on_token(f"\n{result}" if improved_chunks else result)
+                improved_chunks.append(result)
+
+        return "\n".join(improved_chunks)
+
+    def _improve_low_confidence(self, segments, prompt_path, on_token=None):
+        """
+        Send each span around low-confidence words to the model as a numbered
+        fragment to edit; all other words are kept as recognized.
+        """
+        spans = low_confidence_spans(segments)
+        total_words = sum(len(segment["text"].split()) for segment in segments)
+        span_words = sum(span.end - span.start for span in spans)
+        print(f"[LLM] Correcting {span_words} of {total_words} words")
+
+        system_prompt = self.system_prompt(prompt_path)
+        numbered = "\n".join(
+            f"[{i}] {span.text}" for i, span in enumerate(spans, start=1)
+        )
+        corrections = {}
+        with keep_partial(lambda: splice_spans(segments, spans, corrections)):
+            if spans:
+                for chunk, max_tokens in self._plan_chunks(
+                    numbered, system_prompt, "edit"
+                ):
+                    output = self.local_llm(
+                        system_prompt,
+                        chunk,
+                        max_tokens=max_tokens,
+                        grammar=EDIT_GRAMMAR,
+                    )
+                    edits = parse_edits(output)
+                    # Edit the whole span even if the chunker split it
+                    for number in numbered_lines(chunk):
+                        corrections[number - 1] = apply_segment_edits(
+                            spans[number - 1].text, edits.get(number)
+                        )
+
+        result = splice_spans(segments, spans, corrections)
+        if on_token:
+            on_token(result)
+        return result
+
+    def improve_input_budget(self, mode=config.IMPROVE_MODE):
+        """Transcript tokens one correction call takes in the given mode."""
+        if mode == "edits":
+            return self.input_budget("edit", config.IMPROVE_EDITS_PROMPT_PATH)
+        return self.input_budget("improve", config.IMPROVE_PROMPT_PATH)
+
+    def summarize(
+        self,
+        transcription,
+        prompt_path=config.SUMMARIZE_PROMPT_PATH,
+        on_fact=None,
+        language=None,
+    ):
+        """
+        Extract facts with grammar-constrained decoding. Returns validated Facts;
+        `on_fact` is called with each one as soon as its line is generated.
+        """
+        self.use_language(language)
+        transcription = self._smart_text_detect(transcription)
+        system_prompt = self.system_prompt(prompt_path)
+
+        facts = []
+        # Facts already streamed out of an interrupted chunk are complete lines
+        with keep_partial(lambda: facts):
+            for chunk, max_tokens in self._plan_chunks(
+                transcription, system_prompt, "summarize"
+            ):
+                parser = FactStreamParser()
+
+                def on_token(piece):
+                    for fact in parser.feed(piece):
+                        facts.append(fact)
+                        if on_fact:
+                            on_fact(fact)
+
+                self.local_llm(
+                    system_prompt,
+                    chunk,
+                    max_tokens=max_tokens,
+                    on_token=on_token,
+                    grammar=FACT_GRAMMAR,
+                )
+                for fact in parser.finish():
+                    facts.append(fact)
+                    if on_fact:
+                        on_fact(fact)
+
+        return facts
+
+    def analyze(
+        self,
+        facts,
+        all_facts=[],
+        prompt_path=config.ANALYZE_PROMPT_PATH,
+        on_token=None,
+        language=None,
+    ):
+        self.use_language(language)
+        # Fact sets larger than one call go through the map-reduce analyzer so
+        # they never overflow the context, however many facts there are
+        if all_facts:
+            facts = "\n".join(unit.text for unit in all_facts)
+            if self.chunker.count_tokens(facts) > self.input_budget(
+                "analyze", prompt_path
+            ):
+                return self.case_analyzer.analyze(
+                    all_facts, on_token=on_token, language=language
+                )
+
+        facts = self._smart_text_detect(facts)
+
+        system_prompt = self.system_prompt(prompt_path)
+        max_tokens = self.planner.max_tokens(
+            "analyze",
+            len(self.prompts.prefix_tokens(system_prompt)),
+            self.chunker.count_tokens(facts),
+        )
+
+        result = self.local_llm(
+            system_prompt, facts, max_tokens=max_tokens, on_token=on_token
+        )
+        return result
+
+    def _grammar(self, source):
+        if source is None:
+            return None
+        if source not in self._grammars:
+            self._grammars[source] = LlamaGrammar.from_string(source, verbose=False)
+        return self._grammars[source]
+
+    @staticmethod
+    def _sampling_params(max_tokens):
+        return {
+            "max_tokens": max_tokens,
+            "temperature": config.TEMPERATURE,
+            "top_k": config.TOP_K,
+            "top_p": config.TOP_P,
+            "repeat_penalty": config.REPEAT_PENALTY,
+        }
+
+    def _smart_text_detect(self, text_or_path):
+        if os.path.isfile(text_or_path):
+            with open(text_or_path, "r", encoding="utf-8") as file:
+                return file.read()
+        return text_or_path
+
+    def input_budget(self, task, prompt_path):
+        """Largest input (in tokens) one call of `task` can take with this prompt."""
+        system_prompt = self.system_prompt(prompt_path)
+        prompt_tokens = len(self.prompts.prefix_tokens(system_prompt))
+        return self.planner.input_budget(task, prompt_tokens)
+
+    def _plan_chunks(self, text, system_prompt, task):
+        """Yield (chunk, max_tokens) pairs packed to the task's context budget."""
+        prompt_tokens = len(self.prompts.prefix_tokens(system_prompt))
+        chunk_size = self.planner.input_budget(task, prompt_tokens)
+        for chunk in self._break_text_into_chunks(text, chunk_size):
+            input_tokens = self.chunker.count_tokens(chunk)
+            yield chunk, self.planner.max_tokens(task, prompt_tokens, input_tokens)
+
+    def _break_text_into_chunks(self, text, chunk_size=None):
+        if chunk_size is None:
+            chunk_size = self.planner.n_ctx // 8
+
+        return self.chunker.chunk(text, chunk_size)
+
+
+if __name__ == "__main__":
+    try:
+        llm = LLMEngine()
+        text = llm._smart_text_detect(
+            r"C:\Users\user\Desktop\work\device_prototyping\main\src\transcription\results\test_transcription.txt"
+        )
+        improved_text = llm.improve_transcription(text)
+        print("Improved Transcription:", improved_text)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+    ######ПРЕДЫДУЩАЯ ВЕРСИЯ КОДА С LMSTUDIO SERVER, C УНИКАЛЬНЫМИ МОДЕЛЯМИ ДЛЯ КАЖДОГО ЯЗЫКА
+#     def _get_kazakh_llm_response(
+#         self, text, url="http://localhost:1234/v1/chat/completions"
+#     ):
+#         headers = {"Content-Type": "application/json; charset=utf-8"}
+#         payload = {
+#             "model": "checkpoints_llama8b_031224_18900",
+#             "messages": [
+#                 {
+#                     "role": "system",
+#                     "content": "Сізге транскрипция қатесін түзету тапсырылған. Тек түзетілген нұсқаны қайтарыңыз. Қосымша түсініктеме, ескертпе, не басқа мәтін жазбаңыз.",
+#                 },
+#                 {"role": "user", "content": text},
+#             ],
+#             "max_tokens": -1,  # Control output length
+#             "stop": ["\n\n", "Қосымша"],  # Stop generation if unwanted text appears
+#             "temperature": 0.1,  # Reduce randomness for better consistency
+#             "top_p": 0.95,
+#         }
+
+#         try:
+#             response = requests.post(url, headers=headers, json=payload)
+#             response.encoding = "utf-8"
+#             response.encoding = "utf-8"
+#             result = response.json()
+#             print(result)
+
+#             if "choices" not in result or not result["choices"]:
+#                 raise LLMError("Invalid response format from Kazakh LLM")
+
+#             return result["choices"][0]["message"].get("content", text).strip()
+#         except requests.exceptions.RequestException as e:
+#             raise LLMError("Kazakh LLM unreachable")
+
+#     def _get_russian_llm_response(
+#         self, text, url="http://localhost:1234/v1/chat/completions"
+#     ):
+#         headers = {"Content-Type": "application/json; charset=utf-8"}
+#         payload = {
+#             "model": "checkpoints_llama8b_031224_18900",
+#             "messages": [
+#                 {
+#                     "role": "system",
+#                     "content": "Вам дали транскрипцию. Улучшите ее и верните исправленный вариант. ТОЛЬКО исправленный вариант, ничего больше",
+#                 },
+#                 {"role": "user", "content": text},
+#             ],
+#             "max_tokens": -1,  # Control output length
+#             "stop": ["\n\n", "Қосымша"],  # Stop generation if unwanted text appears
+#             "temperature": 0.1,  # Reduce randomness for better consistency
+#             "top_p": 0.95,
+#         }
+
+#         try:
+#             response = requests.post(url, headers=headers, json=payload)
+#             response.encoding = "utf-8"
+#             response.raise_for_status()
+#             result = response.json()
+#             print(result)
+
+#             if "choices" not in result or not result["choices"]:
+#                 raise LLMError("Invalid response format from Russian LLM")
+
+#             return result["choices"][0]["message"].get("content", text).strip()
+#         except requests.exceptions.RequestException as e:
+#             raise LLMError("Russian LLM unreachable")
+
+#     def improve_kazakh_transcription(
+#         self,
+#         text_or_path,
+#         prompt_path="src/llm/prompts/improve_transcription_prompt_kz.txt",
+#     ):
+#         try:
+#             transcription = self._smart_text_detect(text_or_path)
+
+#             with open(prompt_path, "r", encoding="utf-8") as prompt_file:
+#                 prompt = prompt_file.read()
+
+#             combined_text = transcription + "\nprompt:\n" + prompt
+
+#             improved_transcription = self._get_kazakh_llm_response(combined_text)
+
+#             return improved_transcription
+#         except Exception as e:
+#             print(f"Error during improve_kazakh_transcription: {e}")
+#             return None
+
+#     def _get_llm_response(
+#         self, text, url="http://localhost:1234/v1/chat/completions"
+#     ):
+#         headers = {"Content-Type": "application/json; charset=utf-8"}
+#         payload = {
+#             "model": "checkpoints_llama8b_031224_18900",
+#             "messages": [
+#                 {
+#                     "role": "system",
+#                     "content": "Сізге транскрипция қатесін түзету тапсырылған. Тек түзетілген нұсқаны қайтарыңыз. Қосымша түсініктеме, ескертпе, не басқа мәтін жазбаңыз.",
+#                 },
+#                 {"role": "user", "content": text},
+#             ],
+#             "max_tokens": -1,  # Control output length
+#             "stop": ["\n\n", "Қосымша"],  # Stop generation if unwanted text appears
+#             "temperature": 0.1,  # Reduce randomness for better consistency
+#             "top_p": 0.95,
+#         }
+
+#         try:
+#             response = requests.post(url, headers=headers, json=payload)
+#             response.encoding = "utf-8"
+#             response.encoding = "utf-8"
+#             result = response.json()
+#             print(result)
+
+#             if "choices" not in result or not result["choices"]:
+#                 raise LLMError("Invalid response format from Kazakh LLM")
+
+#             return result["choices"][0]["message"].get("content", text).strip()
+#         except requests.exceptions.RequestException as e:
+#             raise LLMError("Kazakh LLM unreachable")
+# # |
+# def improve_transcription(
+#         self,
+#         text_or_path,
+#         prompt_path="src/llm/prompts/improve_transcription_prompt_uni.txt",
+#     ):
+#         try:
+#             transcription = self._smart_text_detect(text_or_path)
+
+#             with open(prompt_path, "r", encoding="utf-8") as prompt_file:
+#                 prompt = prompt_file.read()
+
+#             combined_text = transcription + "\nprompt:\n" + prompt
+
+#             improved_transcription = self._local_llm_response(combined_text)
+
+#             return improved_transcription
+#         except Exception as e:
+#             print(f"Error during improve_transcription: {e}")
+#             return None
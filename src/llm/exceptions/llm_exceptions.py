@@ -2,3 +2,29 @@ class LLMError(Exception):
     """Custom exception for Kazakh LLM failures."""
 
     pass
+
+
+class JobInterrupted(LLMError):
+    """
+    An inference job stopped before it finished. `partial` holds the output of
+    the chunks completed until then, when the job had any.
+    """
+
+    def __init__(self, message, partial=None):
+        super().__init__(message, partial)
+        self.partial = partial
+
+    def __str__(self):
+        return str(self.args[0])
+
+
+class JobCancelled(JobInterrupted):
+    """An inference job was cancelled before it finished."""
+
+    pass
+
+
+class JobTimeout(JobInterrupted, TimeoutError):
+    """An inference job did not finish before its deadline."""
+
+    pass
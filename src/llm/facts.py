@@ -0,0 +1,62 @@
+import json
+from typing import List, NamedTuple
+
+from src.enums import Language
+
+# One JSON object per line, nothing else: no preamble, no blank lines, no status
+FACT_GRAMMAR = r"""
+root ::= fact*
+fact ::= "{\"lang\":\"" lang "\",\"text\":\"" text "\"}\n"
+lang ::= "ru" | "kk"
+text ::= char+
+char ::= [^"\\\n] | "\\" ["\\/bnrt]
+"""
+
+LANGUAGE_CODES = {
+    "ru": Language.RUSSIAN.value,
+    "kk": Language.KAZAKH.value,
+}
+
+MIN_FACT_LENGTH = 3
+
+
+class Fact(NamedTuple):
+    language: str  # Language value, as stored in info_units.language
+    text: str
+
+
+def parse_fact(line: str):
+    """Validate one generated line; returns a Fact or None for anything malformed."""
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    language = LANGUAGE_CODES.get(data.get("lang"))
+    text = data.get("text")
+    if language is None or not isinstance(text, str):
+        return None
+    text = " ".join(text.split())
+    if len(text) < MIN_FACT_LENGTH:
+        return None
+    return Fact(language, text)
+
+
+class FactStreamParser:
+    """Turns streamed pieces of grammar-constrained output into Facts line by line."""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, piece: str) -> List[Fact]:
+        self._buffer += piece
+        *lines, self._buffer = self._buffer.split("\n")
+        return [fact for fact in map(parse_fact, lines) if fact is not None]
+
+    def finish(self) -> List[Fact]:
+        # A line cut off by max_tokens fails validation and is dropped
+        line, self._buffer = self._buffer, ""
+        fact = parse_fact(line) if line.strip() else None
+        return [fact] if fact is not None else []
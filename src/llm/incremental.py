@@ -0,0 +1,118 @@
+import queue
+import threading
+from typing import List, Tuple
+
+from src.enums import Priority
+from src.llm import config
+from src.llm.facts import Fact
+
+
+class IncrementalEnhancer:
+    """
+    Improves transcript segments and extracts facts from them in the background
+    while recording is still running. With `improve` off, the (already
+    punctuated) segments go straight to fact extraction and the improved text
+    is left empty; the rewrite is then requested separately.
+
+    Finalized segments are collected until they fill one LLM chunk, then the
+    batch is queued for the worker thread. When recording stops, only the last,
+    partially filled batch is left to process. Once `cancel_token` is
+    cancelled, the batch in progress is cut short and the rest are skipped. A
+    batch that fails is reported and dropped; the ones after it still run.
+    """
+
+    def __init__(
+        self,
+        llm,
+        on_improved_token=None,
+        on_fact=None,
+        language=None,
+        cancel_token=None,
+        improve=config.LIVE_IMPROVE,
+    ):
+        self.llm = llm
+        self.on_improved_token = on_improved_token
+        self.on_fact = on_fact
+        self.language = language
+        self.cancel_token = cancel_token
+        self.improve = improve
+        self.batch_tokens = (
+            llm.improve_input_budget(language=language)
+            if improve
+            else llm.input_budget("summarize", config.SUMMARIZE_PROMPT_PATH, language)
+        )
+
+        self._pending: List[str] = []
+        self._pending_tokens = 0
+        self._improved: List[str] = []
+        self._facts: List[Fact] = []
+        self._batches: "queue.Queue[str | None]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def feed(self, segments: List[str]):
+        """Add finalized transcript lines; full batches are sent to the worker."""
+        for segment in segments:
+            segment_tokens = self.llm.chunker.count_tokens(segment)
+            if self._pending and (
+                self._pending_tokens + segment_tokens > self.batch_tokens
+            ):
+                self._flush()
+            self._pending.append(segment)
+            self._pending_tokens += segment_tokens
+
+    def finish(self) -> Tuple[str, List[Fact]]:
+        """Process what is left and return (improved text, extracted facts)."""
+        self._flush()
+        self._batches.put(None)
+        self._worker.join()
+        return "\n".join(self._improved), self._facts
+
+    def _flush(self):
+        if self._pending:
+            self._batches.put("\n".join(self._pending))
+            self._pending = []
+            self._pending_tokens = 0
+
+    def _run(self):
+        while True:
+            batch = self._batches.get()
+            if batch is None:
+                return
+            if self.cancel_token is not None and self.cancel_token.is_cancelled():
+                continue
+            try:
+                self._process(batch)
+            except Exception as exc:
+                # E.g. the LLM worker died; the next batch restarts it
+                print(f"Error processing a live transcript batch: {exc}")
+
+    def _process(self, batch):
+        if not self.improve:
+            self._summarize(batch)
+            return
+
+        if self._improved and self.on_improved_token:
+            self.on_improved_token("\n")
+        improved = self.llm.improve_transcription(
+            batch,
+            on_token=self.on_improved_token,
+            language=self.language,
+            priority=Priority.LIVE,
+            cancel_token=self.cancel_token,
+        )
+        if not improved:
+            return
+        self._improved.append(improved)
+        self._summarize(improved)
+
+    def _summarize(self, text):
+        self._facts.extend(
+            self.llm.summarize(
+                text,
+                on_fact=self.on_fact,
+                language=self.language,
+                priority=Priority.LIVE,
+                cancel_token=self.cancel_token,
+            )
+        )
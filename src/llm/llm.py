@@ -1,259 +1,239 @@
 import os
-from llama_cpp import Llama
+import threading
+import time
+
+from src.enums import Priority
 from src.llm import config
-from transformers import AutoTokenizer
-import os
+from src.llm.analysis import AnalysisUnit
+from src.llm.budget import BudgetPlanner
+from src.llm.chunker import TranscriptChunker
+from src.llm.exceptions.llm_exceptions import JobCancelled
+from src.llm.memory import Vocabulary, choose_context
+from src.llm.prompt_registry import PromptRegistry, localized_path
+from src.llm.service import LLMService
 
 
 class LLM:
+    """
+    Thin client of the inference worker process, which owns the model (see
+    src/llm/engine.py and src/llm/service.py). Token counting and budgets are
+    computed here with a vocabulary-only copy of the model, so they never wait
+    behind a running generation.
+
+    Every call takes `priority` (Priority.LIVE jobs run before NORMAL and
+    BACKGROUND ones), an optional `timeout` in seconds and an optional
+    CancellationToken (src/llm/cancellation.py).
+
+    The worker is started on first use and can be stopped when idle (see
+    src/residency.py); unloading frees the whole model.
+    """
 
     def __init__(
         self,
         model_path=str(
             config.PATH_TO_LOCAL_LLM
         ),  # str conversion because An error occurred: 'WindowsPath' object has no attribute 'encode'
-        n_ctx: int = config.MAX_CONTEXT,
+        n_ctx: int = config.CONTEXT_SIZE,
     ):
         if not os.path.isfile(model_path):
             raise FileNotFoundError(f"GGUF model not found: {model_path}")
-        self.llm = Llama(
-            model_path=model_path,
-            n_ctx=n_ctx,
-            n_threads=config.NUM_THREADS,
-            use_mlock=False,
-            use_mmap=True,
-            chat_format="llama-3",
-            verbose=False,
-        )
-        self.tokenizer = AutoTokenizer.from_pretrained(config.HF_MODEL_NAME)
-
-    def local_llm(self, system_prompt, user_prompt, max_tokens=config.MAX_TOKENS):
-        return self.llm.create_chat_completion(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            max_tokens=max_tokens,
-            temperature=config.TEMPERATURE,
-            top_k=config.TOP_K,
-            top_p=config.TOP_P,
-            repeat_penalty=config.REPEAT_PENALTY,
-        )["choices"][0]["message"]["content"].strip()
+        self.tokenizer = Vocabulary(model_path)
+        if not n_ctx:
+            n_ctx = choose_context(
+                self.tokenizer, logits_all=config.SPECULATIVE_DECODING
+            )
+            print(f"LLM context: {n_ctx} tokens ({config.KV_CACHE_TYPE} KV cache)")
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self.service = None
+        self.last_used = time.monotonic()
+        self._service_lock = threading.Lock()
+        self.chunker = TranscriptChunker(self.tokenizer)
+        self.prompts = PromptRegistry(self.tokenizer, cache_dir=None)
+        self.planner = BudgetPlanner(n_ctx)
+
+    def load(self):
+        """Start the inference worker if it is not running."""
+        with self._service_lock:
+            self._start_service()
+            # A prefetch counts as use, or an idle unload could undo it
+            self.last_used = time.monotonic()
+
+    def unload(self):
+        """Stop the inference worker, unless a job is queued or running."""
+        with self._service_lock:
+            if self.service is not None and not self.service.has_pending():
+                self.service.close()
+                self.service = None
+
+    def is_loaded(self):
+        return self.service is not None
+
+    def is_busy(self):
+        service = self.service
+        return service is not None and service.has_pending()
+
+    def memory_bytes(self):
+        service = self.service
+        return service.memory_bytes() if service is not None else 0
+
+    def submit(self, method, *args, **kwargs):
+        """Queue a job on the worker, starting it if needed; returns a Future."""
+        with self._service_lock:
+            self._start_service()
+            self.last_used = time.monotonic()
+            return self.service.submit(method, *args, **kwargs)
+
+    def _start_service(self):
+        if self.service is not None and not self.service.is_alive():
+            # A dead worker would fail every job with its stored error
+            print(f"LLM worker stopped ({self.service._error}), restarting it.")
+            self.service.close()
+            self.service = None
+        if self.service is None:
+            self.service = LLMService(self.model_path, self.n_ctx)
+            self.service.submit(
+                "warm",
+                (
+                    config.IMPROVE_PROMPT_PATH
+                    if config.LIVE_IMPROVE
+                    else config.IMPROVE_SPANS_PROMPT_PATH
+                ),
+                config.SUMMARIZE_PROMPT_PATH,
+                priority=Priority.BACKGROUND,
+            )
 
     def improve_transcription(
         self,
         transcription,
-        prompt_path="src/llm/prompts/improve_transcription_prompt_uni.txt",
+        prompt_path=None,
+        on_token=None,
+        mode=config.IMPROVE_MODE,
+        language=None,
+        priority=Priority.NORMAL,
+        timeout=None,
+        cancel_token=None,
+        segments=None,
     ):
-        transcription = self._smart_text_detect(transcription)
-        chunks = self._break_text_into_chunks(transcription)
-
-        with open(prompt_path, "r", encoding="utf-8") as prompt_file:
-            system_prompt = prompt_file.read().strip()
-
-        improved_chunks = []
-        for chunk in chunks:
-            result = self.local_llm(system_prompt, chunk, max_tokens=2048)
-            improved_chunks.append(result)
-
-        return " ".join(improved_chunks)
+        return self._call(
+            "improve_transcription",
+            transcription,
+            prompt_path=prompt_path,
+            on_token=on_token,
+            mode=mode,
+            language=language,
+            segments=segments,
+            priority=priority,
+            timeout=timeout,
+            cancel_token=cancel_token,
+            cancelled_result="",
+        )
 
     def summarize(
-        self, transcription, prompt_path="src/llm/prompts/summarize_prompt_uni.txt"
+        self,
+        transcription,
+        prompt_path=config.SUMMARIZE_PROMPT_PATH,
+        on_fact=None,
+        language=None,
+        priority=Priority.NORMAL,
+        timeout=None,
+        cancel_token=None,
     ):
-        transcription = self._smart_text_detect(transcription)
-        chunks = self._break_text_into_chunks(transcription)
-
-        with open(prompt_path, "r", encoding="utf-8") as prompt_file:
-            system_prompt = prompt_file.read().strip()
-
-        summary_chunks = []
-        for chunk in chunks:
-            result = self.local_llm(system_prompt, chunk, max_tokens=1024)
-            summary_chunks.append(result)
-
-        return " ".join(summary_chunks)
+        return self._call(
+            "summarize",
+            transcription,
+            prompt_path=prompt_path,
+            on_fact=on_fact,
+            language=language,
+            priority=priority,
+            timeout=timeout,
+            cancel_token=cancel_token,
+            cancelled_result=[],
+        )
 
     def analyze(
         self,
         facts,
         all_facts=[],
-        prompt_path="src/llm/prompts/analyze_prompt_uni.txt",
+        prompt_path=config.ANALYZE_PROMPT_PATH,
+        on_token=None,
+        language=None,
+        priority=Priority.NORMAL,
+        timeout=None,
+        cancel_token=None,
     ):
-        facts = self._smart_text_detect(facts)
-
-        with open(prompt_path, "r", encoding="utf-8") as prompt_file:
-            system_prompt = prompt_file.read().strip()
-
-        result = self.local_llm(system_prompt, facts)
-        return result
-
-    def _smart_text_detect(self, text_or_path):
-        if os.path.isfile(text_or_path):
-            with open(text_or_path, "r", encoding="utf-8") as file:
-                return file.read()
-        return text_or_path
-
-    def _break_text_into_chunks(self, text, chunk_size=None):
-        if chunk_size is None:
-            chunk_size = config.MAX_CONTEXT // 8
-
-        tokens = self.tokenizer.encode(text)
-        token_chunks = [
-            tokens[i : i + chunk_size] for i in range(0, len(tokens), chunk_size)
+        # DB entities stay in this process; the worker only needs their text
+        all_facts = [
+            AnalysisUnit(unit.id, unit.transcription_id, unit.text)
+            for unit in all_facts
         ]
-
-        chunks = [self.tokenizer.decode(chunk) for chunk in token_chunks]
-        return chunks
-
-
-if __name__ == "__main__":
-    try:
-        llm = LLM()
-        text = llm._smart_text_detect(
-            r"C:\Users\user\Desktop\work\device_prototyping\main\src\transcription\results\test_transcription.txt"
+        return self._call(
+            "analyze",
+            facts,
+            all_facts=all_facts,
+            prompt_path=prompt_path,
+            on_token=on_token,
+            language=language,
+            priority=priority,
+            timeout=timeout,
+            cancel_token=cancel_token,
+            cancelled_result="",
         )
-        improved_text = llm.improve_transcription(text)
-        print("Improved Transcription:", improved_text)
-    except Exception as e:
-        print(f"An error occurred: {e}")
-
-    ######ПРЕДЫДУЩАЯ ВЕРСИЯ КОДА С LMSTUDIO SERVER, C УНИКАЛЬНЫМИ МОДЕЛЯМИ ДЛЯ КАЖДОГО ЯЗЫКА
-#     def _get_kazakh_llm_response(
-#         self, text, url="http://localhost:1234/v1/chat/completions"
-#     ):
-#         headers = {"Content-Type": "application/json; charset=utf-8"}
-#         payload = {
-#             "model": "checkpoints_llama8b_031224_18900",
-#             "messages": [
-#                 {
-#                     "role": "system",
-#                     "content": "Сізге транскрипция қатесін түзету тапсырылған. Тек түзетілген нұсқаны қайтарыңыз. Қосымша түсініктеме, ескертпе, не басқа мәтін жазбаңыз.",
-#                 },
-#                 {"role": "user", "content": text},
-#             ],
-#             "max_tokens": -1,  # Control output length
-#             "stop": ["\n\n", "Қосымша"],  # Stop generation if unwanted text appears
-#             "temperature": 0.1,  # Reduce randomness for better consistency
-#             "top_p": 0.95,
-#         }
-
-#         try:
-#             response = requests.post(url, headers=headers, json=payload)
-#             response.encoding = "utf-8"
-#             response.encoding = "utf-8"
-#             result = response.json()
-#             print(result)
-
-#             if "choices" not in result or not result["choices"]:
-#                 raise LLMError("Invalid response format from Kazakh LLM")
-
-#             return result["choices"][0]["message"].get("content", text).strip()
-#         except requests.exceptions.RequestException as e:
-#             raise LLMError("Kazakh LLM unreachable")
-
-#     def _get_russian_llm_response(
-#         self, text, url="http://localhost:1234/v1/chat/completions"
-#     ):
-#         headers = {"Content-Type": "application/json; charset=utf-8"}
-#         payload = {
-#             "model": "checkpoints_llama8b_031224_18900",
-#             "messages": [
-#                 {
-#                     "role": "system",
-#                     "content": "Вам дали транскрипцию. Улучшите ее и верните исправленный вариант. ТОЛЬКО исправленный вариант, ничего больше",
-#                 },
-#                 {"role": "user", "content": text},
-#             ],
-#             "max_tokens": -1,  # Control output length
-#             "stop": ["\n\n", "Қосымша"],  # Stop generation if unwanted text appears
-#             "temperature": 0.1,  # Reduce randomness for better consistency
-#             "top_p": 0.95,
-#         }
-
-#         try:
-#             response = requests.post(url, headers=headers, json=payload)
-#             response.encoding = "utf-8"
-#             response.raise_for_status()
-#             result = response.json()
-#             print(result)
-
-#             if "choices" not in result or not result["choices"]:
-#                 raise LLMError("Invalid response format from Russian LLM")
-
-#             return result["choices"][0]["message"].get("content", text).strip()
-#         except requests.exceptions.RequestException as e:
-#             raise LLMError("Russian LLM unreachable")
-
-#     def improve_kazakh_transcription(
-#         self,
-#         text_or_path,
-#         prompt_path="src/llm/prompts/improve_transcription_prompt_kz.txt",
-#     ):
-#         try:
-#             transcription = self._smart_text_detect(text_or_path)
-
-#             with open(prompt_path, "r", encoding="utf-8") as prompt_file:
-#                 prompt = prompt_file.read()
 
-#             combined_text = transcription + "\nprompt:\n" + prompt
-
-#             improved_transcription = self._get_kazakh_llm_response(combined_text)
-
-#             return improved_transcription
-#         except Exception as e:
-#             print(f"Error during improve_kazakh_transcription: {e}")
-#             return None
-
-#     def _get_llm_response(
-#         self, text, url="http://localhost:1234/v1/chat/completions"
-#     ):
-#         headers = {"Content-Type": "application/json; charset=utf-8"}
-#         payload = {
-#             "model": "checkpoints_llama8b_031224_18900",
-#             "messages": [
-#                 {
-#                     "role": "system",
-#                     "content": "Сізге транскрипция қатесін түзету тапсырылған. Тек түзетілген нұсқаны қайтарыңыз. Қосымша түсініктеме, ескертпе, не басқа мәтін жазбаңыз.",
-#                 },
-#                 {"role": "user", "content": text},
-#             ],
-#             "max_tokens": -1,  # Control output length
-#             "stop": ["\n\n", "Қосымша"],  # Stop generation if unwanted text appears
-#             "temperature": 0.1,  # Reduce randomness for better consistency
-#             "top_p": 0.95,
-#         }
-
-#         try:
-#             response = requests.post(url, headers=headers, json=payload)
-#             response.encoding = "utf-8"
-#             response.encoding = "utf-8"
-#             result = response.json()
-#             print(result)
-
-#             if "choices" not in result or not result["choices"]:
-#                 raise LLMError("Invalid response format from Kazakh LLM")
-
-#             return result["choices"][0]["message"].get("content", text).strip()
-#         except requests.exceptions.RequestException as e:
-#             raise LLMError("Kazakh LLM unreachable")
-# # |
-# def improve_transcription(
-#         self,
-#         text_or_path,
-#         prompt_path="src/llm/prompts/improve_transcription_prompt_uni.txt",
-#     ):
-#         try:
-#             transcription = self._smart_text_detect(text_or_path)
-
-#             with open(prompt_path, "r", encoding="utf-8") as prompt_file:
-#                 prompt = prompt_file.read()
-
-#             combined_text = transcription + "\nprompt:\n" + prompt
-
-#             improved_transcription = self._local_llm_response(combined_text)
-
-#             return improved_transcription
-#         except Exception as e:
-#             print(f"Error during improve_transcription: {e}")
-#             return None
+    def cache_stats(self):
+        """Hit/miss counters and size of the persistent result cache."""
+        return self._call("cache_stats", priority=Priority.LIVE)
+
+    def speculation_stats(self):
+        """Drafted vs. accepted tokens of prompt-lookup decoding so far."""
+        return self._call("speculation_stats", priority=Priority.LIVE)
+
+    def cancel(self, future):
+        """Drop a queued job or stop a running one at its next token."""
+        service = self.service
+        if service is not None:
+            service.cancel(future)
+
+    def _call(self, method, *args, cancel_token=None, cancelled_result=None, **kwargs):
+        """
+        Run a job and wait for it. Once `cancel_token` is cancelled the job is
+        stopped and the call returns what was completed before (or
+        `cancelled_result` if nothing was).
+        """
+        if cancel_token is not None and cancel_token.is_cancelled():
+            return cancelled_result
+
+        future = self.submit(method, *args, **kwargs)
+        unregister = (
+            cancel_token.register(lambda: self.cancel(future))
+            if cancel_token is not None
+            else None
+        )
+        try:
+            return future.result()
+        except JobCancelled as e:
+            if cancel_token is None or not cancel_token.is_cancelled():
+                raise
+            return e.partial if e.partial is not None else cancelled_result
+        finally:
+            if unregister is not None:
+                unregister()
+            self.last_used = time.monotonic()
+
+    def input_budget(self, task, prompt_path, language=None):
+        """Largest input (in tokens) one call of `task` can take with this prompt."""
+        system_prompt = self.prompts.get(localized_path(prompt_path, language))
+        prompt_tokens = len(self.prompts.prefix_tokens(system_prompt))
+        return self.planner.input_budget(task, prompt_tokens)
+
+    def improve_input_budget(self, mode=config.IMPROVE_MODE, language=None):
+        """Transcript tokens one correction call takes in the given mode."""
+        if mode == "edits":
+            return self.input_budget("edit", config.IMPROVE_EDITS_PROMPT_PATH, language)
+        return self.input_budget("improve", config.IMPROVE_PROMPT_PATH, language)
+
+    def close(self):
+        with self._service_lock:
+            if self.service is not None:
+                self.service.close()
+                self.service = None
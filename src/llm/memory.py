@@ -0,0 +1,145 @@
+import time
+from typing import Dict, Tuple
+
+import llama_cpp
+from llama_cpp._internals import LlamaModel
+
+from src.llm import config
+
+# ggml type and bytes per element of each supported KV-cache type
+KV_CACHE_TYPES = {
+    "f16": (llama_cpp.GGML_TYPE_F16, 2.0),
+    "q8_0": (llama_cpp.GGML_TYPE_Q8_0, 34 / 32),
+    "q4_0": (llama_cpp.GGML_TYPE_Q4_0, 18 / 32),
+}
+
+
+class Vocabulary:
+    """Tokenizer-only view of a GGUF model: loads the vocabulary, no weights."""
+
+    def __init__(self, model_path: str):
+        params = llama_cpp.llama_model_default_params()
+        params.vocab_only = True
+        self.model_path = model_path
+        self._model = LlamaModel(path_model=model_path, params=params, verbose=False)
+
+    def tokenize(self, text: bytes, add_bos: bool = True, special: bool = False):
+        return self._model.tokenize(text, add_bos, special)
+
+    def metadata(self) -> Dict[str, str]:
+        return self._model.metadata()
+
+    def n_ctx_train(self) -> int:
+        return self._model.n_ctx_train()
+
+    def n_vocab(self) -> int:
+        return self._model.n_vocab()
+
+
+def kv_cache_types(
+    kv_type: str = config.KV_CACHE_TYPE, flash_attn: bool = config.FLASH_ATTN
+) -> Tuple[str, str]:
+    """(K type, V type); llama.cpp can only quantize the V cache with flash attention."""
+    if kv_type not in KV_CACHE_TYPES:
+        raise ValueError(f"Unknown KV cache type: {kv_type}")
+    return kv_type, kv_type if flash_attn else "f16"
+
+
+def kv_bytes_per_token(metadata: Dict[str, str], type_k: str, type_v: str) -> float:
+    """KV-cache bytes one token of context takes, from the GGUF hyperparameters."""
+    arch = metadata["general.architecture"]
+    n_layer = int(metadata[f"{arch}.block_count"])
+    n_head = int(metadata[f"{arch}.attention.head_count"])
+    n_head_kv = int(metadata.get(f"{arch}.attention.head_count_kv", n_head))
+    n_embd = int(metadata[f"{arch}.embedding_length"])
+    head_k = int(metadata.get(f"{arch}.attention.key_length", n_embd // n_head))
+    head_v = int(metadata.get(f"{arch}.attention.value_length", n_embd // n_head))
+    return (
+        n_layer
+        * n_head_kv
+        * (head_k * KV_CACHE_TYPES[type_k][1] + head_v * KV_CACHE_TYPES[type_v][1])
+    )
+
+
+def choose_context(
+    vocabulary: Vocabulary,
+    budget_bytes: int = config.LLM_MEMORY_BUDGET_BYTES,
+    logits_all: bool = False,
+    kv_type: str = config.KV_CACHE_TYPE,
+) -> int:
+    """
+    Largest context whose KV cache fits the memory budget next to the compute
+    buffers, in CONTEXT_STEP steps between MIN_CONTEXT and the smaller of
+    MAX_CONTEXT and the model's training context. The weights are mmapped and
+    left out of the budget: the OS pages them in and can drop them again.
+    """
+    type_k, type_v = kv_cache_types(kv_type)
+    per_token = kv_bytes_per_token(vocabulary.metadata(), type_k, type_v)
+    if logits_all:
+        # Llama keeps a float32 row of logits for every context position
+        per_token += vocabulary.n_vocab() * 4
+
+    fixed = config.COMPUTE_BUFFER_BYTES + config.N_BATCH * vocabulary.n_vocab() * 4
+    fitting = int((budget_bytes - fixed) / per_token)
+    limit = min(config.MAX_CONTEXT, vocabulary.n_ctx_train())
+    n_ctx = min(fitting, limit) // config.CONTEXT_STEP * config.CONTEXT_STEP
+    if n_ctx < config.MIN_CONTEXT:
+        print(
+            f"Warning: LLM memory budget of {budget_bytes >> 20} MiB fits only "
+            f"{max(n_ctx, 0)} tokens of context, using {config.MIN_CONTEXT}. "
+            f"Raise DOPROS_LLM_MEMORY_MB or set DOPROS_LLM_CONTEXT."
+        )
+        return config.MIN_CONTEXT
+    return n_ctx
+
+
+def probe(model_path: str, n_tokens: int = 512, n_generate: int = 64):
+    """
+    Load the model with every KV-cache type and report the context chosen for
+    the memory budget, prompt-eval and generation speed.
+    """
+    from llama_cpp import Llama
+
+    vocabulary = Vocabulary(model_path)
+    prompt = list(range(100, 100 + n_tokens))
+
+    report = {}
+    for kv_type in KV_CACHE_TYPES:
+        type_k, type_v = kv_cache_types(kv_type)
+        per_token = kv_bytes_per_token(vocabulary.metadata(), type_k, type_v)
+        n_ctx = choose_context(vocabulary, kv_type=kv_type)
+
+        llm = Llama(
+            model_path=model_path,
+            n_ctx=n_ctx,
+            n_threads=config.NUM_THREADS,
+            n_batch=config.N_BATCH,
+            n_ubatch=config.N_UBATCH,
+            flash_attn=config.FLASH_ATTN,
+            type_k=KV_CACHE_TYPES[type_k][0],
+            type_v=KV_CACHE_TYPES[type_v][0],
+            verbose=False,
+        )
+        started = time.perf_counter()
+        llm.eval(prompt)
+        prompt_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(n_generate):
+            llm.eval([llm.sample(temp=0.0)])
+        generate_seconds = time.perf_counter() - started
+
+        report[kv_type] = {
+            "n_ctx": n_ctx,
+            "kv_cache_mib": round(per_token * n_ctx / 2**20),
+            "prompt_tokens_per_second": round(n_tokens / prompt_seconds, 1),
+            "generate_tokens_per_second": round(n_generate / generate_seconds, 1),
+        }
+        llm.close()
+    return report
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(probe(str(config.PATH_TO_LOCAL_LLM)), indent=2))
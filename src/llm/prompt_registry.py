@@ -0,0 +1,164 @@
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from llama_cpp import Llama, LlamaDiskCache, LlamaRAMCache, LlamaState
+from llama_cpp.llama_chat_format import format_llama3
+
+from src.llm import config
+from src.llm.memory import kv_cache_types
+
+
+def localized_path(prompt_path, language: Optional[str]) -> Path:
+    """
+    The `language` variant of a universal prompt ("x_uni.txt" -> "x_kaz.txt")
+    when that file exists, otherwise the universal prompt itself.
+    """
+    path = Path(prompt_path)
+    if language and path.stem.endswith("_uni"):
+        variant = path.with_name(f"{path.stem[:-4]}_{language}{path.suffix}")
+        if variant.is_file():
+            return variant
+    return path
+
+
+# Marker used to cut the formatted chat prompt right where the user turn begins
+_USER_SENTINEL = "\x00DOPROS_USER\x00"
+
+
+class PromptRegistry:
+    """
+    Loads system prompts once and keeps the evaluated KV state of every
+    system-prompt prefix (RAM, optionally disk, both LRU-evicted), so each
+    chunk only has to evaluate its own tokens.
+
+    States depend on the weights they were computed with, so they are kept
+    per `variant` (the active LoRA adapter, "" for the base model).
+    """
+
+    def __init__(
+        self,
+        llm: Llama,
+        ram_capacity_bytes: int = config.PROMPT_CACHE_RAM_BYTES,
+        cache_dir: Optional[Path] = config.PROMPT_CACHE_DIR,
+        disk_capacity_bytes: int = config.PROMPT_CACHE_DISK_BYTES,
+    ):
+        self.llm = llm
+        self.ram_capacity_bytes = ram_capacity_bytes
+        self.cache_dir = cache_dir
+        self.disk_capacity_bytes = disk_capacity_bytes
+        self.variant = ""
+        self._texts: Dict[str, str] = {}
+        self._prefix_tokens: Dict[str, Tuple[int, ...]] = {}
+        self._ram_caches: Dict[str, LlamaRAMCache] = {}
+        self._disk_caches: Dict[str, Optional[LlamaDiskCache]] = {}
+
+    @property
+    def ram_cache(self) -> LlamaRAMCache:
+        if self.variant not in self._ram_caches:
+            self._ram_caches[self.variant] = LlamaRAMCache(
+                capacity_bytes=self.ram_capacity_bytes
+            )
+        return self._ram_caches[self.variant]
+
+    @property
+    def disk_cache(self) -> Optional[LlamaDiskCache]:
+        if self.variant not in self._disk_caches:
+            disk_cache = None
+            if self.cache_dir is not None:
+                # One directory per model file, KV-cache layout and context:
+                # token ids of different models collide, and states saved with
+                # other KV types, n_ctx or n_batch don't load
+                model_dir = Path(self.cache_dir) / "-".join(
+                    (
+                        Path(self.llm.model_path).stem,
+                        *kv_cache_types(),
+                        f"ctx{self.llm.n_ctx()}",
+                        f"batch{self.llm.n_batch}",
+                    )
+                )
+                if self.variant:
+                    model_dir = model_dir / self.variant
+                disk_cache = LlamaDiskCache(
+                    cache_dir=str(model_dir), capacity_bytes=self.disk_capacity_bytes
+                )
+            self._disk_caches[self.variant] = disk_cache
+        return self._disk_caches[self.variant]
+
+    def get(self, prompt_path) -> str:
+        """Return the prompt text, reading the file only on first use."""
+        key = str(Path(prompt_path))
+        if key not in self._texts:
+            with open(key, "r", encoding="utf-8") as prompt_file:
+                self._texts[key] = prompt_file.read().strip()
+        return self._texts[key]
+
+    def warm(self, *prompt_paths):
+        """Precompute KV states for the given prompt files."""
+        for prompt_path in prompt_paths:
+            self.restore(self.get(prompt_path))
+
+    def prefix_tokens(self, system_prompt: str) -> Tuple[int, ...]:
+        """Tokens of the chat-formatted conversation up to the user's content."""
+        if system_prompt not in self._prefix_tokens:
+            formatted = format_llama3(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": _USER_SENTINEL},
+                ]
+            ).prompt
+            prefix = formatted.split(_USER_SENTINEL)[0]
+            self._prefix_tokens[system_prompt] = tuple(
+                self.llm.tokenize(prefix.encode("utf-8"), add_bos=True, special=True)
+            )
+        return self._prefix_tokens[system_prompt]
+
+    def restore(self, system_prompt: str):
+        """
+        Make sure the model's KV cache starts with the evaluated system prompt.
+        llama.cpp then only evaluates the part of the next prompt after it.
+        """
+        tokens = self.prefix_tokens(system_prompt)
+        if self._is_loaded(tokens):
+            return
+
+        state = self._lookup(tokens)
+        if state is not None:
+            self.llm.load_state(state)
+            return
+
+        self.llm.reset()
+        self.llm.eval(tokens)
+        state = self.llm.save_state()
+        # Prompt logits are never sampled from; keep one row, it broadcasts on
+        # load. A copy, so the n_batch x n_vocab array it came from is freed.
+        state.scores = state.scores[-1:].copy()
+        self.ram_cache[tokens] = state
+        if self.disk_cache is not None:
+            self.disk_cache[tokens] = state
+
+    def _is_loaded(self, tokens: Tuple[int, ...]) -> bool:
+        if self.llm.n_tokens < len(tokens):
+            return False
+        return tuple(self.llm.input_ids[: len(tokens)].tolist()) == tokens
+
+    def _lookup(self, tokens: Tuple[int, ...]) -> Optional[LlamaState]:
+        # Both caches return the longest shared prefix, so check for an exact match
+        if tokens in self.ram_cache:
+            state = self.ram_cache[tokens]
+            if self._matches(state, tokens):
+                return state
+
+        if self.disk_cache is not None and tokens in self.disk_cache:
+            state = self.disk_cache[tokens]
+            # LlamaDiskCache pops on read; put it back under its own key
+            self.disk_cache[tuple(state.input_ids[: state.n_tokens].tolist())] = state
+            if self._matches(state, tokens):
+                self.ram_cache[tokens] = state
+                return state
+        return None
+
+    @staticmethod
+    def _matches(state: LlamaState, tokens: Tuple[int, ...]) -> bool:
+        return state.n_tokens == len(tokens) and (
+            tuple(state.input_ids[: state.n_tokens].tolist()) == tokens
+        )
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+import diskcache
+
+from src.llm import config
+
+# Bytes read from the head of the model file for its fingerprint
+_FINGERPRINT_HEAD_BYTES = 1 << 20
+
+
+class ResultCache:
+    """
+    Persistent, content-addressed cache of LLM completions.
+
+    Entries are keyed by a hash of (model file, system prompt, sampling params,
+    input chunk), so re-running a task on unchanged text returns instantly and
+    only edited chunks are regenerated. Size-bounded with LRU eviction.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        directory: Path = config.RESULT_CACHE_DIR,
+        size_limit: int = config.RESULT_CACHE_BYTES,
+    ):
+        self.cache = diskcache.Cache(
+            str(directory),
+            size_limit=size_limit,
+            eviction_policy="least-recently-used",
+        )
+        self.cache.stats(enable=True)
+        self.model_id = self._fingerprint(model_path)
+
+    def key(self, system_prompt: str, user_prompt: str, params: dict) -> str:
+        payload = json.dumps(
+            {
+                "model": self.model_id,
+                "system": system_prompt,
+                "params": params,
+                "input": user_prompt,
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        return self.cache.get(key)
+
+    def set(self, key: str, result: str):
+        self.cache.set(key, result)
+
+    def stats(self) -> dict:
+        hits, misses = self.cache.stats()
+        return {
+            "hits": hits,
+            "misses": misses,
+            "entries": len(self.cache),
+            "size_bytes": self.cache.volume(),
+        }
+
+    @staticmethod
+    def _fingerprint(model_path: str) -> str:
+        """Identify the model by name, size, mtime and a hash of its header."""
+        stat = os.stat(model_path)
+        digest = hashlib.sha256()
+        with open(model_path, "rb") as model_file:
+            digest.update(model_file.read(_FINGERPRINT_HEAD_BYTES))
+        return f"{Path(model_path).name}:{stat.st_size}:{int(stat.st_mtime)}:{digest.hexdigest()}"
@@ -0,0 +1,302 @@
+import heapq
+import itertools
+import multiprocessing
+import pickle
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+import psutil
+
+from src.enums import Priority
+from src.llm.exceptions.llm_exceptions import JobCancelled, JobTimeout, LLMError
+
+# LLMEngine methods a client may call
+JOB_METHODS = {
+    "improve_transcription",
+    "summarize",
+    "analyze",
+    "warm",
+    "cache_stats",
+    "speculation_stats",
+}
+
+
+class _Job:
+    def __init__(self, job_id, priority, deadline, method, args, kwargs, callbacks):
+        self.id = job_id
+        self.priority = priority
+        self.deadline = deadline
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.callbacks = callbacks
+        self.cancelled = False
+
+    def check(self):
+        """Raise if the job should stop; called before it starts and per token."""
+        if self.cancelled:
+            raise JobCancelled(f"Job {self.id} cancelled")
+        if self.deadline is not None and time.time() > self.deadline:
+            raise JobTimeout(f"Job {self.id} timed out")
+
+
+class _JobQueue:
+    """Priority queue of jobs, FIFO within one priority."""
+
+    def __init__(self):
+        self._heap: List = []
+        self._jobs: Dict[int, _Job] = {}
+        self._order = itertools.count()
+        self._ready = threading.Condition()
+        self._closed = False
+
+    def put(self, job: _Job):
+        with self._ready:
+            self._jobs[job.id] = job
+            heapq.heappush(self._heap, (job.priority, next(self._order), job))
+            self._ready.notify()
+
+    def get(self) -> Optional[_Job]:
+        """Next job to run, or None once closed."""
+        with self._ready:
+            while not self._closed:
+                while self._heap:
+                    _, _, job = heapq.heappop(self._heap)
+                    if not job.cancelled:
+                        return job
+                    del self._jobs[job.id]
+                self._ready.wait()
+            return None
+
+    def cancel(self, job_id: int) -> bool:
+        """Mark a job cancelled; True when it was still waiting in the queue."""
+        with self._ready:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            job.cancelled = True
+            return any(queued is job for _, _, queued in self._heap)
+
+    def done(self, job: _Job):
+        with self._ready:
+            self._jobs.pop(job.id, None)
+
+    def close(self):
+        with self._ready:
+            self._closed = True
+            self._ready.notify_all()
+
+
+def _serve(conn, model_path, n_ctx):
+    """Entry point of the worker process: load the model and run jobs one by one."""
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    jobs = _JobQueue()
+
+    def receive():
+        # Runs next to the job loop so jobs can be queued and cancelled mid-run
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                message = ("stop",)
+            if message[0] == "submit":
+                jobs.put(_Job(*message[1:]))
+            elif message[0] == "cancel":
+                if jobs.cancel(message[1]):
+                    send(
+                        (
+                            "error",
+                            message[1],
+                            JobCancelled(f"Job {message[1]} cancelled"),
+                        )
+                    )
+            elif message[0] == "stop":
+                jobs.close()
+                return
+
+    threading.Thread(target=receive, daemon=True).start()
+
+    # Imported here so the client process never loads llama.cpp's model code
+    from src.llm.engine import LLMEngine
+
+    try:
+        engine = LLMEngine(model_path, n_ctx)
+    except Exception as e:
+        send(("fatal", None, _transferable(e)))
+        return
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+
+        kwargs = dict(job.kwargs)
+        for name in job.callbacks:
+            kwargs[name] = lambda value, name=name, job_id=job.id: send(
+                ("event", job_id, name, value)
+            )
+        engine.interrupt = job.check
+        try:
+            job.check()
+            result = getattr(engine, job.method)(*job.args, **kwargs)
+            send(("result", job.id, result))
+        except Exception as e:
+            send(("error", job.id, _transferable(e)))
+        finally:
+            engine.interrupt = None
+            jobs.done(job)
+
+
+def _transferable(error: Exception) -> Exception:
+    """Exceptions are pickled back to the client; fall back to LLMError if that fails."""
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return LLMError(f"{type(error).__name__}: {error}")
+
+
+class LLMService:
+    """
+    Client side of the inference worker process.
+
+    Jobs are sent over a pipe and answered with Futures. The worker runs one
+    job at a time, picking the highest priority first; queued jobs can be
+    cancelled, and a running job stops at its next token when cancelled or
+    past its timeout. Streaming callbacks run on this side's reader thread.
+    """
+
+    def __init__(self, model_path: str, n_ctx: int):
+        self._conn, worker_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(worker_conn, model_path, n_ctx), daemon=True
+        )
+        self._process.start()
+        worker_conn.close()
+
+        self._ids = itertools.count(1)
+        self._send_lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._callbacks: Dict[int, dict] = {}
+        self._error: Optional[Exception] = None
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def submit(
+        self,
+        method: str,
+        *args,
+        priority: Priority = Priority.NORMAL,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> Future:
+        """
+        Queue `method` of the worker's LLMEngine. Callable keyword arguments
+        (on_token, on_fact, ...) are kept here and fed by the worker's events.
+        """
+        if method not in JOB_METHODS:
+            raise ValueError(f"Unknown LLM job: {method}")
+        if self._error is not None:
+            raise self._error
+
+        callbacks = {name: value for name, value in kwargs.items() if callable(value)}
+        kwargs = {
+            name: value for name, value in kwargs.items() if name not in callbacks
+        }
+        deadline = time.time() + timeout if timeout is not None else None
+
+        job_id = next(self._ids)
+        future = Future()
+        future.job_id = job_id
+        self._pending[job_id] = future
+        self._callbacks[job_id] = callbacks
+        self._send(
+            (
+                "submit",
+                job_id,
+                int(priority),
+                deadline,
+                method,
+                args,
+                kwargs,
+                list(callbacks),
+            )
+        )
+        return future
+
+    def is_alive(self) -> bool:
+        """False once the worker has exited or failed; it then takes no jobs."""
+        return self._error is None and self._process.is_alive()
+
+    def has_pending(self) -> bool:
+        """True while any submitted job has not finished."""
+        return bool(self._pending)
+
+    def memory_bytes(self) -> int:
+        """Resident memory of the worker process (model weights, KV cache)."""
+        try:
+            return psutil.Process(self._process.pid).memory_info().rss
+        except psutil.Error:
+            return 0
+
+    def cancel(self, future: Future):
+        """Drop the job if still queued, or stop it at its next token."""
+        if not future.done():
+            self._send(("cancel", future.job_id))
+
+    def close(self):
+        try:
+            self._send(("stop",))
+        except OSError:
+            pass
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+
+    def _send(self, message):
+        with self._send_lock:
+            self._conn.send(message)
+
+    def _read(self):
+        while True:
+            try:
+                message = self._conn.recv()
+            except (EOFError, OSError):
+                self._fail_all(LLMError("LLM worker process exited"))
+                return
+
+            kind, job_id = message[0], message[1]
+            if kind == "event":
+                callback = self._callbacks.get(job_id, {}).get(message[2])
+                if callback is not None:
+                    try:
+                        callback(message[3])
+                    except Exception as e:
+                        print(f"LLM {message[2]} callback failed: {e}")
+            elif kind == "fatal":
+                self._fail_all(message[2])
+                return
+            else:
+                future = self._pending.pop(job_id, None)
+                self._callbacks.pop(job_id, None)
+                if future is None:
+                    continue
+                if kind == "result":
+                    future.set_result(message[2])
+                else:
+                    future.set_exception(message[2])
+
+    def _fail_all(self, error: Exception):
+        self._error = error
+        for job_id in list(self._pending):
+            future = self._pending.pop(job_id, None)
+            self._callbacks.pop(job_id, None)
+            if future is not None and not future.done():
+                future.set_exception(error)
@@ -0,0 +1,119 @@
+import time
+
+import numpy as np
+from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+
+from src.llm import config
+
+
+class PromptLookupDraft(LlamaPromptLookupDecoding):
+    """
+    Prompt-lookup drafts (n-grams copied from the input) that also count how
+    many drafted tokens the model accepted.
+
+    llama.cpp calls the draft model once per verification step with every token
+    kept so far, so each call tells us how much of the previous draft survived.
+    The draft of the last step of a generation is never verified and not counted.
+    """
+
+    def __init__(
+        self,
+        max_ngram_size: int = config.SPECULATIVE_MAX_NGRAM,
+        num_pred_tokens: int = config.SPECULATIVE_NUM_PRED_TOKENS,
+    ):
+        super().__init__(max_ngram_size, num_pred_tokens)
+        self.steps = 0
+        self.proposed = 0
+        self.accepted = 0
+        self._draft = np.array([], dtype=np.intc)
+        self._draft_at = 0
+
+    def begin(self):
+        """Forget the pending draft; called before each new generation."""
+        self._draft = np.array([], dtype=np.intc)
+        self._draft_at = 0
+
+    def __call__(self, input_ids, /, **kwargs):
+        if len(self._draft) and len(input_ids) > self._draft_at:
+            kept = input_ids[self._draft_at : self._draft_at + len(self._draft)]
+            # accepted = drafted tokens kept before the first rejected one
+            rejected = np.flatnonzero(kept != self._draft[: len(kept)])
+            self.proposed += len(self._draft)
+            self.accepted += int(rejected[0]) if len(rejected) else len(kept)
+
+        draft = super().__call__(input_ids, **kwargs)
+        self.steps += 1
+        self._draft = np.array(draft, dtype=np.intc)
+        self._draft_at = len(input_ids)
+        return draft
+
+    def stats(self):
+        return {
+            "steps": self.steps,
+            "proposed": self.proposed,
+            "accepted": self.accepted,
+            "acceptance_rate": self.accepted / self.proposed if self.proposed else 0.0,
+        }
+
+
+def benchmark(llm, text, prompt_path=config.IMPROVE_PROMPT_PATH):
+    """
+    Correct `text` with plain and with prompt-lookup decoding and report tokens
+    per second for both. Calls the model directly, bypassing the result cache.
+    """
+    system_prompt = llm.system_prompt(prompt_path)
+    chunks = list(
+        llm._plan_chunks(llm._smart_text_detect(text), system_prompt, "improve")
+    )
+    llm.prompts.restore(system_prompt)
+
+    report = {}
+    for mode, speculative in (("plain", False), ("prompt_lookup", True)):
+        before = llm.speculation_stats()
+        tokens = 0
+        started = time.perf_counter()
+        for chunk, max_tokens in chunks:
+            output = "".join(
+                llm.stream_llm(
+                    system_prompt, chunk, max_tokens, speculative=speculative
+                )
+            )
+            tokens += llm.chunker.count_tokens(output)
+        elapsed = time.perf_counter() - started
+        after = llm.speculation_stats()
+
+        report[mode] = {
+            "seconds": round(elapsed, 2),
+            "tokens": tokens,
+            "tokens_per_second": round(tokens / elapsed, 2) if elapsed else 0.0,
+        }
+        if speculative:
+            proposed = after["proposed"] - before["proposed"]
+            accepted = after["accepted"] - before["accepted"]
+            report[mode]["acceptance_rate"] = (
+                round(accepted / proposed, 3) if proposed else 0.0
+            )
+
+    if report["prompt_lookup"]["seconds"]:
+        report["speedup"] = round(
+            report["plain"]["seconds"] / report["prompt_lookup"]["seconds"], 2
+        )
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from src.llm.engine import LLMEngine
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark prompt-lookup decoding against plain decoding"
+    )
+    parser.add_argument("transcripts", nargs="+", help="Transcript .txt files")
+    args = parser.parse_args()
+
+    llm = LLMEngine(speculative=True)
+    for path in args.transcripts:
+        print(path)
+        print(json.dumps(benchmark(llm, path), indent=2))
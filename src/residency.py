@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import Dict
+
+
+class ResidencyManager:
+    """
+    Keeps large models in memory only while they are used.
+
+    A registered model loads itself on first use and exposes:
+        load(), unload(), is_loaded(), is_busy(), memory_bytes(), last_used
+    where `last_used` is a time.monotonic() timestamp. A background thread
+    unloads every model that was idle for longer than its idle time.
+    """
+
+    def __init__(self, poll_seconds: float = 30):
+        self.poll_seconds = poll_seconds
+        self._models: Dict[str, object] = {}
+        self._idle_seconds: Dict[str, float] = {}
+        self._busy_at: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def register(self, name: str, model, idle_seconds: float):
+        self._models[name] = model
+        self._idle_seconds[name] = idle_seconds
+        self._busy_at[name] = time.monotonic()
+
+    def prefetch(self, *names: str):
+        """Start loading the models in the background, e.g. when recording starts."""
+        for name in names:
+            model = self._models[name]
+            if not model.is_loaded():
+                threading.Thread(
+                    target=self._load, args=(name, model), daemon=True
+                ).start()
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes held by each registered model right now (0 when unloaded)."""
+        return {
+            name: model.memory_bytes() if model.is_loaded() else 0
+            for name, model in self._models.items()
+        }
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _load(self, name, model):
+        started = time.monotonic()
+        model.load()
+        # Idle time counts from the prefetch, not from the model's last job
+        self._busy_at[name] = time.monotonic()
+        print(
+            f"[Residency] Loaded {name} in {time.monotonic() - started:.1f}s, "
+            f"{model.memory_bytes() / 2**20:.0f} MiB"
+        )
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            now = time.monotonic()
+            for name, model in self._models.items():
+                if not model.is_loaded():
+                    continue
+                if model.is_busy():
+                    self._busy_at[name] = now
+                    continue
+
+                idle = now - max(model.last_used, self._busy_at[name])
+                if idle > self._idle_seconds[name]:
+                    memory = model.memory_bytes()
+                    model.unload()
+                    print(
+                        f"[Residency] Unloaded {name} after {idle:.0f}s idle, "
+                        f"freed ~{memory / 2**20:.0f} MiB"
+                    )
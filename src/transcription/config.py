@@ -1,4 +1,6 @@
 LIVE_RECORDING_CHUNK_LENGTH = 2
+PNC_BATCH_SIZE = 8
+PNC_MAX_SEQ_LENGTH = 128
 
 ###LOAD ENV FROM .ENV FILE
 import os
@@ -9,8 +11,16 @@ load_dotenv(find_dotenv())
 
 TRANSCRIPTION_RESULT_PATH = Path(os.getenv("DOPROS_TRANSCRIPTION_RESULT_PATH"))
 ASR_MODEL_PATH = Path(os.getenv("DOPROS_ASR_MODEL_PATH", ""))
+# Optional NeMo punctuation/capitalization model (src/transcription/punctuation.py)
+PNC_MODEL_PATH = (
+    Path(os.getenv("DOPROS_PNC_MODEL_PATH"))
+    if os.getenv("DOPROS_PNC_MODEL_PATH")
+    else None
+)
 
 TRANSCRIPTION_RESULT_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 if not ASR_MODEL_PATH.exists():
     raise FileNotFoundError(f"ASR Model file not found from .env: {ASR_MODEL_PATH}")
+if PNC_MODEL_PATH is not None and not PNC_MODEL_PATH.exists():
+    raise FileNotFoundError(f"PnC model file not found from .env: {PNC_MODEL_PATH}")
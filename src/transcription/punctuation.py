@@ -0,0 +1,71 @@
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from src.transcription import config
+
+_SENTENCE_END = ".?!…"
+
+
+class Punctuator:
+    """
+    Restores punctuation and capitalization of raw ASR segments in
+    milliseconds, so the live transcript is readable without the LLM.
+
+    Uses a NeMo punctuation-and-capitalization model when DOPROS_PNC_MODEL_PATH
+    is set; otherwise only capitalizes the segment and closes the sentence.
+    """
+
+    def __init__(self, model_path: Optional[Path] = config.PNC_MODEL_PATH):
+        self.model_path = model_path
+        self.model = None
+        self._model_lock = threading.Lock()
+
+    def load(self):
+        if self.model_path is None:
+            return
+        with self._model_lock:
+            if self.model is None:
+                from nemo.collections.nlp.models import PunctuationCapitalizationModel
+
+                self.model = PunctuationCapitalizationModel.restore_from(
+                    str(self.model_path)
+                )
+                self.model.eval()
+
+    def unload(self):
+        with self._model_lock:
+            self.model = None
+
+    def memory_bytes(self) -> int:
+        model = self.model
+        if model is None:
+            return 0
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    def punctuate(self, text: str) -> str:
+        return self.punctuate_batch([text])[0]
+
+    def punctuate_batch(self, texts: List[str]) -> List[str]:
+        model = self.model
+        if model is None:
+            return [_close_sentence(text) for text in texts]
+        # Lower-cased input matches what the model was trained on
+        queries = [text.lower() for text in texts]
+        punctuated = model.add_punctuation_capitalization(
+            queries,
+            batch_size=config.PNC_BATCH_SIZE,
+            max_seq_length=config.PNC_MAX_SEQ_LENGTH,
+        )
+        return [_close_sentence(text) for text in punctuated]
+
+
+def _close_sentence(text: str) -> str:
+    text = text.strip()
+    if not text:
+        return text
+    text = text[0].upper() + text[1:]
+    if text[-1] not in _SENTENCE_END:
+        text += "."
+    return text
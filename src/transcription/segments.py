@@ -0,0 +1,20 @@
+from typing import List, NamedTuple, Optional
+
+
+class Word(NamedTuple):
+    text: str
+    confidence: Optional[float]  # None if the decoder did not report one
+    start: Optional[float]  # seconds from the start of the recording
+    end: Optional[float]
+
+
+def align_words(text: str, words: List[Word]) -> List[Word]:
+    """
+    Carry the words of a segment over to its punctuated `text`. Punctuation
+    and capitalization keep one token per word; if the counts differ anyway,
+    the words cannot be matched and are dropped.
+    """
+    tokens = text.split()
+    if len(tokens) != len(words):
+        return []
+    return [word._replace(text=token) for token, word in zip(tokens, words)]
@@ -1,5 +1,7 @@
 # src/transcription/transcribe.py
 
+import copy
+import gc
 import os
 import time
 import wave
@@ -9,16 +11,20 @@ import logging
 import warnings
 
 from concurrent.futures import ThreadPoolExecutor
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import pyaudio
+import torch
 from pydub import AudioSegment
 import nemo.collections.asr as nemo_asr
 from nemo.collections.asr.parts.utils.rnnt_utils import Hypothesis
 import nemo.utils
+from omegaconf import open_dict
 
 from src.transcription import config
 from src.transcription.doa import VoiceDirectionFinder
+from src.transcription.punctuation import Punctuator
+from src.transcription.segments import Word, align_words
 
 # Silence NeMo logging
 logging.getLogger("nemo_logger").setLevel(logging.ERROR)
@@ -38,19 +44,123 @@ class Transcriber:
     def __init__(self, model_path: str = config.ASR_MODEL_PATH):
         self.vdf = VoiceDirectionFinder(bucket_size=50)
         self.stop_recording = threading.Event()
-        self.model = nemo_asr.models.EncDecHybridRNNTCTCBPEModel.restore_from(
-            model_path
-        )
+        self.model_path = model_path
+        # Loaded on first use, unloaded when idle (see src/residency.py)
+        self.model = None
+        self.punctuator = Punctuator()
+        # Segments of the current/last recording, with per-word confidences
+        self.segments: List[Dict] = []
+        self.recording = False
+        self.last_used = time.monotonic()
+        self._model_lock = threading.Lock()
         self.executor = ThreadPoolExecutor(max_workers=2)
 
+    def load(self):
+        with self._model_lock:
+            if self.model is None:
+                model = nemo_asr.models.EncDecHybridRNNTCTCBPEModel.restore_from(
+                    self.model_path
+                )
+                model.change_decoding_strategy(self._decoding_cfg(model))
+                self.model = model
+        self.punctuator.load()
+
+    def unload(self):
+        with self._model_lock:
+            if self.model is None or self.recording:
+                return
+            self.model = None
+        self.punctuator.unload()
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    def is_busy(self) -> bool:
+        return self.recording
+
+    def memory_bytes(self) -> int:
+        model = self.model
+        if model is None:
+            return 0
+        tensors = list(model.parameters()) + list(model.buffers())
+        asr_bytes = sum(t.numel() * t.element_size() for t in tensors)
+        return asr_bytes + self.punctuator.memory_bytes()
+
+    @staticmethod
+    def _decoding_cfg(model):
+        """Greedy decoding that also keeps word confidences and timestamps."""
+        decoding_cfg = copy.deepcopy(model.cfg.decoding)
+        with open_dict(decoding_cfg):
+            decoding_cfg.compute_timestamps = True
+            decoding_cfg.confidence_cfg.preserve_frame_confidence = True
+            decoding_cfg.confidence_cfg.preserve_token_confidence = True
+            decoding_cfg.confidence_cfg.preserve_word_confidence = True
+        return decoding_cfg
+
     def transcribe_audio(self, wav_path: str) -> str | None:
-        output: List[Hypothesis] = self.model.transcribe([wav_path])
+        result = self.transcribe_words(wav_path)
+        return result[0] if result else None
+
+    def transcribe_words(
+        self, wav_path: str, offset: float = 0.0
+    ) -> Optional[Tuple[str, List[Word]]]:
+        """Text and words (confidence, start/end seconds + `offset`) of a WAV file."""
+        self.load()
+        self.last_used = time.monotonic()
+        output: List[Hypothesis] = self.model.transcribe(
+            [wav_path], return_hypotheses=True
+        )
         if not output or not isinstance(output[0], Hypothesis):
             return None
-        text = output[0].text.strip()
-        return text or None
+        hypothesis = output[0]
+        text = hypothesis.text.strip()
+        if not text:
+            return None
+        return text, self._words(hypothesis, offset)
+
+    def _words(self, hypothesis: Hypothesis, offset: float) -> List[Word]:
+        words = hypothesis.words or hypothesis.text.split()
+        confidences = hypothesis.word_confidence or []
+        # "timestamp" in recent NeMo versions, "timestep" before
+        stamps = getattr(hypothesis, "timestamp", None) or getattr(
+            hypothesis, "timestep", None
+        )
+        stamps = stamps.get("word", []) if isinstance(stamps, dict) else []
+        frame_seconds = (
+            self.model.cfg.preprocessor.window_stride
+            * self.model.cfg.encoder.get("subsampling_factor", 1)
+        )
+
+        result = []
+        for i, word in enumerate(words):
+            confidence = float(confidences[i]) if i < len(confidences) else None
+            start = end = None
+            if i < len(stamps):
+                stamp = stamps[i]
+                if "start" in stamp:
+                    start, end = stamp["start"], stamp["end"]
+                else:
+                    start = stamp["start_offset"] * frame_seconds
+                    end = stamp["end_offset"] * frame_seconds
+                start, end = round(offset + start, 2), round(offset + end, 2)
+            result.append(Word(word, confidence, start, end))
+        return result
 
     def record_and_transcribe(self) -> Tuple[str, str]:
+        self.recording = True
+        # Left set by the previous session's stop
+        self.stop_recording.clear()
+        try:
+            self.load()
+            return self._record_and_transcribe()
+        finally:
+            self.recording = False
+            self.last_used = time.monotonic()
+
+    def _record_and_transcribe(self) -> Tuple[str, str]:
         pa = pyaudio.PyAudio()
         stream = pa.open(
             format=pyaudio.paInt16,
@@ -73,6 +183,7 @@ class Transcriber:
         candidate_count = 0
 
         all_speakers_text: List[str] = []
+        self.segments = []
         # clear result file
         with open(config.TRANSCRIPTION_RESULT_PATH, "w", encoding="utf-8"):
             pass
@@ -94,10 +205,13 @@ class Transcriber:
                     wf.setframerate(self._SAMPLE_RATE)
                     wf.writeframes(b"".join(frames))
 
-            text = self.transcribe_audio(wav_path)
+            result = self.transcribe_words(wav_path, offset=chunk_start - start_time)
             os.unlink(wav_path)
-            if not text:
+            if not result:
                 return
+            raw_text, words = result
+            text = self.punctuator.punctuate(raw_text)
+            words = align_words(text, words)
 
             speaker = self.vdf.classify_speaker(bucket)
             timestamp = time.strftime(
@@ -106,6 +220,14 @@ class Transcriber:
             with open(config.TRANSCRIPTION_RESULT_PATH, "a", encoding="utf-8") as f:
                 f.write(f"{timestamp} {speaker}: {text}\n")
             all_speakers_text.append(text)
+            self.segments.append(
+                {
+                    "timestamp": timestamp,
+                    "speaker": speaker,
+                    "text": text,
+                    "words": [list(word) for word in words],
+                }
+            )
             print(f"{timestamp} {speaker}: {text}")
 
         try:
@@ -1,3 +1,4 @@
+import json
 import tkinter as tk
 import threading
 import time
@@ -5,15 +6,42 @@ from tkinter import messagebox
 
 from src.transcription.transcribe import Transcriber
 from src.llm.llm import LLM
+from src.llm.cancellation import CancellationToken
+from src.llm.incremental import IncrementalEnhancer
 from src.enums import Language
 from src.case.orchestrator import Orchestrator
+from src.residency import ResidencyManager
 import config
 
 
+def page_on_scroll(listbox, load_page, scrollbar=None):
+    """
+    Keep appending pages to `listbox` as it is scrolled to its end: load_page()
+    appends the next page and returns False once there are no more.
+    """
+    more = True
+
+    def load():
+        nonlocal more
+        more = load_page()
+
+    def on_scroll(first, last):
+        nonlocal more
+        if scrollbar is not None:
+            scrollbar.set(first, last)
+        if more and float(last) >= 1.0:
+            # Inserting the page scrolls again; don't load it twice
+            more = False
+            listbox.after_idle(load)
+
+    listbox.config(yscrollcommand=on_scroll)
+
+
 class RecorderThread(threading.Thread):
     """
-    Thread that continuously records audio in chunks, then emits final
-    transcriptions and improved transcriptions once stopped.
+    Thread that continuously records audio in chunks, improving finalized
+    segments in the background, and emits the merged final transcription,
+    improved transcription and facts once stopped.
     """
 
     def __init__(
@@ -25,6 +53,9 @@ class RecorderThread(threading.Thread):
         on_transcription_done=None,
         on_improved_transcription_done=None,
         on_analysis_done=None,
+        on_improved_transcription_token=None,
+        on_analysis_token=None,
+        cancel_token=None,
     ):
         super().__init__()
         self.transcriber = transcriber
@@ -35,14 +66,32 @@ class RecorderThread(threading.Thread):
         self.on_transcription_done = on_transcription_done
         self.on_improved_transcription_done = on_improved_transcription_done
         self.on_analysis_done = on_analysis_done
+        # streaming callbacks, called with each generated piece of text
+        self.on_improved_transcription_token = on_improved_transcription_token
+        self.on_analysis_token = on_analysis_token
+        # cancelled when the session is abandoned; partial results are still saved
+        self.cancel_token = cancel_token or CancellationToken()
         self.orchestrator: Orchestrator = None
         self.case_id = None        
+        self.created_transcription_id = None
+        # ASR segments with word confidences, used to gate the LLM correction
+        self.segments = []
         # accumulator for live transcript
         self._accumulated = ""
 
     def run(self):
         self._accumulated = ""
         last_known_transcription = ""
+        fed_lines = 0
+
+        # Enhances finalized segments in the background while we keep recording
+        enhancer = IncrementalEnhancer(
+            self.llm,
+            on_improved_token=self.on_improved_transcription_token,
+            on_fact=self._emit_fact,
+            language=self.language,
+            cancel_token=self.cancel_token,
+        )
 
         def background_record():
             self._final_text, self._final_mp3 = self.transcriber.record_and_transcribe()
@@ -57,9 +106,10 @@ class RecorderThread(threading.Thread):
 
             try:
                 with open(config.TRANSCRIPTION_RESULT_PATH, "r", encoding="utf-8") as f:
-                    current = f.read().strip()
+                    raw = f.read()
             except FileNotFoundError:
-                current = ""
+                raw = ""
+            current = raw.strip()
 
             if current and current != last_known_transcription:
                 new_content = current[len(last_known_transcription):].strip()
@@ -68,30 +118,44 @@ class RecorderThread(threading.Thread):
                 if new_content and self.on_transcription_done:
                     self.on_transcription_done(current)
 
+            # Every line terminated by a newline is a finalized segment
+            finalized = raw.split("\n")[:-1]
+            if len(finalized) > fed_lines:
+                enhancer.feed(finalized[fed_lines:])
+                fed_lines = len(finalized)
+
         # Wait for the recording thread to finish
         recording_thread.join()
 
+        try:
+            with open(config.TRANSCRIPTION_RESULT_PATH, "r", encoding="utf-8") as f:
+                self._accumulated = f.read().strip() or self._accumulated
+        except FileNotFoundError:
+            pass
+
         # Final update (just in case)
         final_text = self._accumulated.strip() or getattr(self, "_final_text", "")
         mp3_path = getattr(self, "_final_mp3", "")
+        self.segments = list(self.transcriber.segments)
 
         if self.on_transcription_done:
             self.on_transcription_done(final_text)
 
-        improved = self.llm.improve_transcription(final_text)
+        # Only the segments flushed after the last full batch are left to process
+        enhancer.feed(final_text.split("\n")[fed_lines:])
+        improved, facts = enhancer.finish()
+        cancelled = self.cancel_token.is_cancelled()
 
-        if self.on_improved_transcription_done:
+        # Empty unless the LLM rewrite runs live (DOPROS_LIVE_IMPROVE)
+        if self.on_improved_transcription_done and improved and not cancelled:
             self.on_improved_transcription_done(improved)
 
-        info_units_unprocessed = self.llm.summarize(improved)
-        info_units = info_units_unprocessed.split("\n")
-
-        if self.on_analysis_done:
-            self.on_analysis_done(info_units_unprocessed)
+        if self.on_analysis_done and not cancelled:
+            self.on_analysis_done("\n".join(fact.text for fact in facts))
 
-        created_transcription = None
         if self.orchestrator and self.case_id:
-            created_transcription = self.orchestrator.create_transcription(
+            # The transcription and all its facts are written in one transaction
+            created_transcription, _ = self.orchestrator.save_session(
                 {
                     "title": f"Transcription at {time.strftime('%Y-%m-%d %H:%M:%S')}",
                     "case_id": self.case_id,
@@ -99,25 +163,30 @@ class RecorderThread(threading.Thread):
                     "improved_text": improved,
                     "description": "",
                     "mp3_url": mp3_path,
-                }
+                    "segments": json.dumps(self.segments, ensure_ascii=False),
+                },
+                [(fact.text, fact.language) for fact in facts],
             )
+            self.created_transcription_id = created_transcription.id
 
-        if len(info_units) > 0 and created_transcription:
-            for text_unit in info_units:
-                self.orchestrator.create_info_unit(
-                    case_id=self.case_id,
-                    transcription_id=created_transcription.id,
-                    text=text_unit,
-                    language=self.language,
-                )
+        # A cancelled session may already have been superseded by a new recording
+        if not cancelled:
+            with open(config.TRANSCRIPTION_RESULT_PATH, "w", encoding="utf-8") as f:
+                f.write("")
 
-        with open(config.TRANSCRIPTION_RESULT_PATH, "w", encoding="utf-8") as f:
-            f.write("")
+    def _emit_fact(self, fact):
+        if self.on_analysis_token:
+            self.on_analysis_token(fact.text + "\n")
 
     def stop(self):
         self._stop_flag = True
         self.transcriber.stop_recording.set()
 
+    def cancel(self):
+        """Stop recording and abort the LLM work still running for this session."""
+        self.cancel_token.cancel()
+        self.stop()
+
 
 class MainWindow(tk.Tk):
     def __init__(self):
@@ -142,7 +211,19 @@ class MainWindow(tk.Tk):
         self.orchestrator = Orchestrator()
         print("Orchestrator initialized, time taken is ", time.time() - self.start_time)
 
+        # Both models load on first use and are unloaded again when idle
+        self.residency = ResidencyManager(config.RESIDENCY_POLL_SECONDS)
+        self.residency.register("asr", self.transcriber, config.ASR_IDLE_SECONDS)
+        self.residency.register("llm", self.llm, config.LLM_IDLE_SECONDS)
+
         self.recorder_thread = None
+        # Transcription saved by the last session, target of "Improve"
+        self.last_transcription_id = None
+        self.last_segments = []
+        # LLM work of the current session (live enhancement and post-analysis)
+        self.llm_cancel_token = CancellationToken()
+        # The running "Improve" job, replaced on every click
+        self.improve_cancel_token = CancellationToken()
         self.language = Language.RUSSIAN.value
 
         self.main_screen = tk.Frame(self, bg="#2d2d30")
@@ -189,12 +270,18 @@ class MainWindow(tk.Tk):
 
     def populate_case_list(self):
         self.case_listbox.delete(0, tk.END)
-        cases = self.orchestrator.get_case_list()
         self.case_map = {}
-        for idx, case in enumerate(cases):
+        page_on_scroll(self.case_listbox, self.load_case_page)
+        self.load_case_page()
+
+    def load_case_page(self):
+        after_id = self.case_map[len(self.case_map) - 1] if self.case_map else None
+        cases = self.orchestrator.get_case_headers(after_id)
+        for case in cases:
             label = f"{case.id} ({case.status})"
             self.case_listbox.insert(tk.END, label)
-            self.case_map[idx] = case.id
+            self.case_map[len(self.case_map)] = case.id
+        return bool(cases)
 
     def on_case_selected(self):
         sel = self.case_listbox.curselection()
@@ -285,6 +372,18 @@ class MainWindow(tk.Tk):
         )
         self.language_button.pack(side="left", padx=5)
 
+        self.improve_button = tk.Button(
+            top_frame,
+            text="Improve",
+            command=self.improve_transcription,
+            bg="#3e3e42",
+            fg="#ffffff",
+            activebackground="#505050",
+            width=5,
+            height=1,
+        )
+        self.improve_button.pack(side="left", padx=5)
+
         textboxes_frame = tk.Frame(self.second_screen, bg="#2d2d30")
         textboxes_frame.pack(expand=True, fill="both")
 
@@ -312,12 +411,27 @@ class MainWindow(tk.Tk):
         self.show_frame(self.second_screen)
 
     def go_to_main_screen(self):
+        if self.recorder_thread is not None and self.recorder_thread.is_alive():
+            self.stop_recording()
+        self.cancel_llm_work()
         self.show_frame(self.main_screen)
 
+    def cancel_llm_work(self):
+        """Abort the LLM work of the current session so the CPU is free at once."""
+        self.llm_cancel_token.cancel()
+        self.improve_cancel_token.cancel()
+
     def start_recording(self):
         print("Recording started...")
         self.record_button.pack_forget()
         self.stop_button.pack(side="left", padx=5)
+        self.improved_transcription_textbox.delete("1.0", tk.END)
+        self.analysis_textbox.delete("1.0", tk.END)
+        self.residency.prefetch("asr", "llm")
+
+        # A new session supersedes whatever is still running for the previous one
+        self.cancel_llm_work()
+        self.llm_cancel_token = CancellationToken()
 
         self.recorder_thread = RecorderThread(
             self.transcriber,
@@ -327,6 +441,13 @@ class MainWindow(tk.Tk):
             on_transcription_done=self.handle_transcription,
             on_improved_transcription_done=self.handle_improved_transcription,
             on_analysis_done=self.handle_analysis,
+            on_improved_transcription_token=lambda piece: self.append_streamed_text(
+                self.improved_transcription_textbox, piece
+            ),
+            on_analysis_token=lambda piece: self.append_streamed_text(
+                self.analysis_textbox, piece
+            ),
+            cancel_token=self.llm_cancel_token,
         )
         self.recorder_thread.orchestrator = self.orchestrator
         self.recorder_thread.case_id = self.case_id_selected
@@ -334,39 +455,119 @@ class MainWindow(tk.Tk):
 
     def stop_recording(self):
         if self.recorder_thread is not None:
-            self.recorder_thread.stop()
+            recorder_thread = self.recorder_thread
+            recorder_thread.stop()
 
             def wait_for_thread():
-                self.recorder_thread.join()
-                self.recorder_thread = None
-                threading.Thread(target=self.post_analysis).start()
+                recorder_thread.join()
+                transcription_id = recorder_thread.created_transcription_id
+                if transcription_id:
+                    self.last_transcription_id = transcription_id
+                self.last_segments = recorder_thread.segments
+                # A new recording may have started meanwhile
+                if self.recorder_thread is recorder_thread:
+                    self.recorder_thread = None
+                threading.Thread(
+                    target=self.post_analysis,
+                    args=(transcription_id, recorder_thread.cancel_token),
+                ).start()
 
             threading.Thread(target=wait_for_thread).start()
 
         self.stop_button.pack_forget()
         self.record_button.pack(side="left", padx=5)
 
-    def post_analysis(self):
+    def post_analysis(self, transcription_id=None, cancel_token=None):
         if not self.case_id_selected:
             return
+        if cancel_token is not None and cancel_token.is_cancelled():
+            return
 
-        info_units = self.orchestrator.get_info_unit_list(self.case_id_selected)
+        if transcription_id:
+            # Check the new session's facts against the most related ones in the case
+            info_units = self.orchestrator.get_related_info_units(
+                self.case_id_selected, transcription_id
+            )
+        else:
+            info_units = self.orchestrator.get_info_unit_list(self.case_id_selected)
         if not info_units:
             print("No info units found for analysis.")
             return
 
         all_text = "\n".join([unit.text for unit in info_units])
+        self.analysis_textbox.after(0, lambda: self.update_analysis_box(""))
         try:
-            result = self.llm.analyze(all_text, all_facts=info_units)
+            result = self.llm.analyze(
+                all_text,
+                all_facts=info_units,
+                language=self.language,
+                on_token=lambda piece: self.append_streamed_text(
+                    self.analysis_textbox, piece
+                ),
+                cancel_token=cancel_token,
+            )
         except Exception as e:
             result = f"Error during analysis: {e}"
+        if cancel_token is not None and cancel_token.is_cancelled():
+            return
 
         self.analysis_textbox.after(0, lambda: self.update_analysis_box(result))
 
+    def improve_transcription(self):
+        """Rewrite the shown transcript with the LLM, on request only."""
+        transcription = self.transcription_textbox.get("1.0", tk.END).strip()
+        if not transcription:
+            return
+        if self.recorder_thread is not None and self.recorder_thread.is_alive():
+            messagebox.showinfo("Recording", "Stop recording first.")
+            return
+
+        self.improved_transcription_textbox.delete("1.0", tk.END)
+        transcription_id = self.last_transcription_id
+        segments = self.last_segments
+        # A new click supersedes the previous one; a cancelled session's token
+        # must not silence it
+        self.improve_cancel_token.cancel()
+        cancel_token = self.improve_cancel_token = CancellationToken()
+
+        def run():
+            try:
+                improved = self.llm.improve_transcription(
+                    transcription,
+                    on_token=lambda piece: self.append_streamed_text(
+                        self.improved_transcription_textbox, piece
+                    ),
+                    language=self.language,
+                    cancel_token=cancel_token,
+                    # Only the spans the ASR was unsure about are corrected
+                    segments=segments,
+                )
+            except Exception as e:
+                self.handle_improved_transcription(f"Error during improvement: {e}")
+                return
+            if cancel_token.is_cancelled():
+                return
+            self.handle_improved_transcription(improved)
+            if transcription_id:
+                self.orchestrator.partial_update_transcription(
+                    transcription_id, {"improved_text": improved}
+                )
+
+        threading.Thread(target=run, daemon=True).start()
+
     def update_analysis_box(self, content):
         self.analysis_textbox.delete("1.0", tk.END)
         self.analysis_textbox.insert(tk.END, content)
 
+    def append_streamed_text(self, textbox, piece):
+        """Append a streamed piece of LLM output; safe to call from worker threads."""
+
+        def append():
+            textbox.insert(tk.END, piece)
+            textbox.see(tk.END)
+
+        textbox.after(0, append)
+
     def handle_transcription(self, transcription):
         self.transcription_textbox.delete("1.0", tk.END)
         self.transcription_textbox.insert(
@@ -374,14 +575,21 @@ class MainWindow(tk.Tk):
         )
 
     def handle_improved_transcription(self, improved):
-        self.improved_transcription_textbox.delete("1.0", tk.END)
-        self.improved_transcription_textbox.insert(tk.END, improved)
+        # Queued behind the streamed pieces so the final text replaces them
+        def replace():
+            self.improved_transcription_textbox.delete("1.0", tk.END)
+            self.improved_transcription_textbox.insert(tk.END, improved)
+
+        self.improved_transcription_textbox.after(0, replace)
 
     def handle_analysis(self, analysis):
-        self.analysis_textbox.delete("1.0", tk.END)
-        self.analysis_textbox.insert(
-            tk.END, analysis if isinstance(analysis, str) else ""
-        )
+        def replace():
+            self.analysis_textbox.delete("1.0", tk.END)
+            self.analysis_textbox.insert(
+                tk.END, analysis if isinstance(analysis, str) else ""
+            )
+
+        self.analysis_textbox.after(0, replace)
 
     def toggle_language(self):
         if self.language == Language.RUSSIAN.value:
@@ -396,17 +604,15 @@ class MainWindow(tk.Tk):
             messagebox.showinfo("No case", "No case selected.")
             return
 
-        records = self.orchestrator.fetch_transcriptions_by_case_id(
-            self.case_id_selected
-        )
-        if not records:
-            messagebox.showinfo(
-                "No data", f"No transcriptions for {self.case_id_selected}"
-            )
+        case_id = self.case_id_selected
+        # Only ids and titles are listed; the texts load for the selected record
+        headers = self.orchestrator.fetch_transcription_headers(case_id)
+        if not headers:
+            messagebox.showinfo("No data", f"No transcriptions for {case_id}")
             return
 
         popup = tk.Toplevel(self)
-        popup.title(f"Transcriptions for {self.case_id_selected}")
+        popup.title(f"Transcriptions for {case_id}")
         popup.geometry("500x300")
         popup.configure(bg="#2d2d30")
 
@@ -415,22 +621,36 @@ class MainWindow(tk.Tk):
 
         scrollbar = tk.Scrollbar(popup, command=listbox.yview)
         scrollbar.pack(side="left", fill="y")
-        listbox.config(yscrollcommand=scrollbar.set)
 
         details = tk.Text(popup, bg="#1e1e1e", fg="#c0c0c0", state="disabled")
         details.pack(side="left", fill="both", expand=True, padx=5, pady=5)
 
-        idx_to_rec = {}
-        for idx, rec in enumerate(records):
-            label = f"{rec.id}: {rec.title}"
-            listbox.insert(tk.END, label)
-            idx_to_rec[idx] = rec
+        idx_to_id = []
+
+        def add_page(page):
+            for header in page:
+                label = f"{header.id}: {header.title}"
+                listbox.insert(tk.END, label)
+                idx_to_id.append(header.id)
+            return bool(page)
+
+        def load_page():
+            return add_page(
+                self.orchestrator.fetch_transcription_headers(
+                    case_id, before_id=idx_to_id[-1]
+                )
+            )
+
+        add_page(headers)
+        page_on_scroll(listbox, load_page, scrollbar)
 
         def on_select(event):
             sel = listbox.curselection()
             if not sel:
                 return
-            rec = idx_to_rec[sel[0]]
+            rec = self.orchestrator.get_transcription(idx_to_id[sel[0]])
+            if rec is None:
+                return
             info = (
                 f"ID: {rec.id}\n"
                 f"Title: {rec.title}\n"
@@ -453,6 +673,8 @@ class MainWindow(tk.Tk):
 def main():
     app = MainWindow()
     app.mainloop()
+    app.residency.stop()
+    app.llm.close()
 
 
 if __name__ == "__main__":